@@ -0,0 +1,70 @@
+"""ingestion jobs table added
+
+Revision ID: 4f2a9c1e7b3d
+Revises: 546434906a63
+Create Date: 2026-10-17 10:12:41.220318
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4f2a9c1e7b3d"
+down_revision: Union[str, Sequence[str], None] = "546434906a63"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ingestion_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("document_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "status",
+            sa.Enum(
+                "queued",
+                "parsing",
+                "embedding",
+                "indexed",
+                "failed",
+                name="ingestionstatusenum",
+            ),
+            nullable=False,
+        ),
+        sa.Column("pages_done", sa.Integer(), nullable=False),
+        sa.Column("pages_total", sa.Integer(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["document_id"], ["documents.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_ingestion_jobs_id"), "ingestion_jobs", ["id"], unique=False
+    )
+    op.create_index(
+        op.f("ix_ingestion_jobs_document_id"),
+        "ingestion_jobs",
+        ["document_id"],
+        unique=False,
+    )
+    op.create_index(
+        op.f("ix_ingestion_jobs_status"), "ingestion_jobs", ["status"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_ingestion_jobs_status"), table_name="ingestion_jobs")
+    op.drop_index(op.f("ix_ingestion_jobs_document_id"), table_name="ingestion_jobs")
+    op.drop_index(op.f("ix_ingestion_jobs_id"), table_name="ingestion_jobs")
+    op.drop_table("ingestion_jobs")
+    sa.Enum(name="ingestionstatusenum").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,58 @@
+"""content hash added to documents, chunk embeddings table added
+
+Revision ID: a83d5e20c6f1
+Revises: 4f2a9c1e7b3d
+Create Date: 2026-10-17 11:03:17.584102
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a83d5e20c6f1"
+down_revision: Union[str, Sequence[str], None] = "4f2a9c1e7b3d"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "documents", sa.Column("content_hash", sa.String(length=64), nullable=True)
+    )
+    op.create_index(
+        op.f("ix_documents_content_hash"), "documents", ["content_hash"], unique=False
+    )
+
+    op.create_table(
+        "chunk_embeddings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("content_hash", sa.String(length=64), nullable=False),
+        sa.Column("embedding_model", sa.String(), nullable=False),
+        sa.Column("page_num", sa.Integer(), nullable=False),
+        sa.Column("chunk_num", sa.Integer(), nullable=False),
+        sa.Column("text", sa.String(), nullable=False),
+        sa.Column("embedding", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("content_hash", "embedding_model", "page_num", "chunk_num"),
+    )
+    op.create_index(
+        op.f("ix_chunk_embeddings_content_hash"),
+        "chunk_embeddings",
+        ["content_hash"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        op.f("ix_chunk_embeddings_content_hash"), table_name="chunk_embeddings"
+    )
+    op.drop_table("chunk_embeddings")
+    op.drop_index(op.f("ix_documents_content_hash"), table_name="documents")
+    op.drop_column("documents", "content_hash")
@@ -0,0 +1,54 @@
+"""upload sessions table added, file size added to documents
+
+Revision ID: b7d3e8f25a91
+Revises: f6b2d9e4c1a8
+Create Date: 2026-10-17 18:42:09.318274
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d3e8f25a91"
+down_revision: Union[str, Sequence[str], None] = "f6b2d9e4c1a8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # existing documents count as 0 bytes until backfilled from their blobs
+    op.add_column("documents", sa.Column("file_size", sa.BigInteger(), nullable=True))
+
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("workspace_id", sa.Integer(), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("received", sa.BigInteger(), nullable=False),
+        sa.Column("tmp_path", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["workspace_id"], ["workspace.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_upload_sessions_user_id"),
+        "upload_sessions",
+        ["user_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_upload_sessions_user_id"), table_name="upload_sessions")
+    op.drop_table("upload_sessions")
+    op.drop_column("documents", "file_size")
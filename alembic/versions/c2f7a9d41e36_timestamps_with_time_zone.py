@@ -0,0 +1,58 @@
+"""timestamp columns made timezone aware
+
+Revision ID: c2f7a9d41e36
+Revises: b7d3e8f25a91
+Create Date: 2026-10-17 21:05:47.120583
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c2f7a9d41e36"
+down_revision: Union[str, Sequence[str], None] = "b7d3e8f25a91"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# every value written so far is UTC
+_COLUMNS = [
+    ("refresh_tokens", "created_at"),
+    ("workspace", "created_at"),
+    ("chat_history", "created_at"),
+    ("chat_messages", "created_at"),
+    ("documents", "upload_time"),
+    ("notes", "created_at"),
+    ("ingestion_jobs", "created_at"),
+    ("ingestion_jobs", "updated_at"),
+    ("ingestion_jobs", "finished_at"),
+    ("upload_sessions", "created_at"),
+    ("upload_sessions", "updated_at"),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in _COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=sa.DateTime(timezone=True),
+            existing_type=sa.DateTime(),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in _COLUMNS:
+        op.alter_column(
+            table,
+            column,
+            type_=sa.DateTime(),
+            existing_type=sa.DateTime(timezone=True),
+            postgresql_using=f"{column} AT TIME ZONE 'UTC'",
+        )
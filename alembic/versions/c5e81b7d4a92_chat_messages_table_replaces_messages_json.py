@@ -0,0 +1,109 @@
+"""chat messages table replaces chat history messages json
+
+Revision ID: c5e81b7d4a92
+Revises: a83d5e20c6f1
+Create Date: 2026-10-17 13:41:05.317248
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5e81b7d4a92"
+down_revision: Union[str, Sequence[str], None] = "a83d5e20c6f1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BATCH_SIZE = 1000
+
+chat_history = sa.table(
+    "chat_history",
+    sa.column("id", sa.Integer),
+    sa.column("messages", sa.JSON),
+    sa.column("last_seq", sa.Integer),
+    sa.column("message_count", sa.Integer),
+)
+
+chat_messages = sa.table(
+    "chat_messages",
+    sa.column("chat_id", sa.Integer),
+    sa.column("seq", sa.Integer),
+    sa.column("sender", sa.String),
+    sa.column("text", sa.String),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "chat_messages",
+        sa.Column("chat_id", sa.Integer(), nullable=False),
+        sa.Column("seq", sa.Integer(), nullable=False),
+        sa.Column("sender", sa.String(), nullable=False),
+        sa.Column("text", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["chat_id"], ["chat_history.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("chat_id", "seq"),
+    )
+    op.add_column(
+        "chat_history",
+        sa.Column("last_seq", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "chat_history",
+        sa.Column("message_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+
+    # backfill: one row per element of each JSON array, seq starting at 1
+    conn = op.get_bind()
+    for chat_id, messages in conn.execute(
+        sa.select(chat_history.c.id, chat_history.c.messages)
+    ).fetchall():
+        rows = [
+            {
+                "chat_id": chat_id,
+                "seq": seq,
+                "sender": message.get("sender", ""),
+                "text": message.get("text", ""),
+            }
+            for seq, message in enumerate(messages or [], start=1)
+        ]
+
+        for i in range(0, len(rows), _BATCH_SIZE):
+            conn.execute(chat_messages.insert(), rows[i : i + _BATCH_SIZE])
+
+        conn.execute(
+            chat_history.update()
+            .where(chat_history.c.id == chat_id)
+            .values(last_seq=len(rows), message_count=len(rows))
+        )
+
+    op.drop_column("chat_history", "messages")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column("chat_history", sa.Column("messages", sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    chat_ids = conn.execute(sa.select(chat_history.c.id)).scalars().all()
+    for chat_id in chat_ids:
+        rows = conn.execute(
+            sa.select(chat_messages.c.sender, chat_messages.c.text)
+            .where(chat_messages.c.chat_id == chat_id)
+            .order_by(chat_messages.c.seq)
+        ).fetchall()
+
+        conn.execute(
+            chat_history.update()
+            .where(chat_history.c.id == chat_id)
+            .values(messages=[{"sender": s, "text": t} for s, t in rows])
+        )
+
+    op.drop_column("chat_history", "message_count")
+    op.drop_column("chat_history", "last_seq")
+    op.drop_table("chat_messages")
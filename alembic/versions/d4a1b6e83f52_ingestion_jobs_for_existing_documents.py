@@ -0,0 +1,48 @@
+"""ingestion jobs backfilled for documents indexed before the queue
+
+Revision ID: d4a1b6e83f52
+Revises: c2f7a9d41e36
+Create Date: 2026-10-17 23:02:15.408816
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a1b6e83f52"
+down_revision: Union[str, Sequence[str], None] = "c2f7a9d41e36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # documents uploaded before the queue existed were indexed inline; give
+    # them a finished job so a missing job always means a problem
+    indexed = "'indexed'"
+    if op.get_bind().dialect.name == "postgresql":
+        indexed = "CAST('indexed' AS ingestionstatusenum)"
+
+    op.execute(
+        sa.text(
+            "INSERT INTO ingestion_jobs "
+            "(document_id, status, pages_done, attempts, "
+            "created_at, updated_at, finished_at) "
+            f"SELECT d.id, {indexed}, 0, 0, "
+            "d.upload_time, d.upload_time, d.upload_time "
+            "FROM documents d WHERE NOT EXISTS "
+            "(SELECT 1 FROM ingestion_jobs j WHERE j.document_id = d.id)"
+        )
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # jobs that actually ran were claimed at least once
+    op.execute(
+        sa.text("DELETE FROM ingestion_jobs WHERE attempts = 0 AND status = 'indexed'")
+    )
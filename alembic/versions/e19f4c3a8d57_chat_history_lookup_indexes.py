@@ -0,0 +1,43 @@
+"""chat history lookup indexes
+
+Revision ID: e19f4c3a8d57
+Revises: c5e81b7d4a92
+Create Date: 2026-10-17 14:26:52.901734
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e19f4c3a8d57"
+down_revision: Union[str, Sequence[str], None] = "c5e81b7d4a92"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # chat_messages pages are served by its (chat_id, seq) primary key; these
+    # cover finding the chat itself
+    op.create_index(
+        "ix_chat_history_document_id_chat_mode",
+        "chat_history",
+        ["document_id", "chat_mode"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_chat_history_note_id_chat_mode",
+        "chat_history",
+        ["note_id", "chat_mode"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_chat_history_note_id_chat_mode", table_name="chat_history")
+    op.drop_index("ix_chat_history_document_id_chat_mode", table_name="chat_history")
@@ -0,0 +1,39 @@
+"""chat history running summary
+
+Revision ID: f6b2d9e4c1a8
+Revises: e19f4c3a8d57
+Create Date: 2026-10-17 15:08:33.642190
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f6b2d9e4c1a8"
+down_revision: Union[str, Sequence[str], None] = "e19f4c3a8d57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("chat_history", sa.Column("summary", sa.String(), nullable=True))
+    op.add_column(
+        "chat_history",
+        sa.Column(
+            "summarized_through_seq",
+            sa.Integer(),
+            nullable=False,
+            server_default="0",
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("chat_history", "summarized_through_seq")
+    op.drop_column("chat_history", "summary")
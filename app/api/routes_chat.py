@@ -1,7 +1,8 @@
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.websockets import WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 
@@ -9,15 +10,31 @@ import asyncio
 import json
 
 from models import db_models
+from core.config import settings
+from services.chroma_db import count_tokens
+from services.context_assembler import ContextAssembler
 from services.langchain_agent import initialize_chain
-from models.schemas import ChatInput, ChatOutput
-from models.db_models import User
-from utils.user_utils import get_current_user
-from db.session import get_db
-from utils.chat_utils import load_context, get_or_create_chat_history
+from models.schemas import ChatInput, ChatOutput, ChatPageOut, Principal
+from utils.user_utils import get_current_principal
+from db.session import AsyncSessionLocal, get_async_db
+from utils.chat_utils import (
+    append_chat_messages,
+    clear_chat_messages,
+    get_or_create_chat_history,
+    load_chat_messages,
+    load_chat_page,
+    load_context,
+    save_chat_summary,
+)
 
 router = APIRouter()
 
+context_assembler = ContextAssembler(
+    token_budget=settings.CHAT_CONTEXT_TOKEN_BUDGET,
+    count_tokens=count_tokens,
+    duplicate_threshold=settings.CHAT_CONTEXT_DUPLICATE_THRESHOLD,
+)
+
 
 @router.get("/{component_id}")
 async def get_chat(
@@ -25,12 +42,18 @@ async def get_chat(
     tp: str,
     mode: str,
     feynman_level: Optional[str] = None,
-    _: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    limit: int = Query(50, ge=1, le=200),
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if tp not in ("document", "note"):
         raise HTTPException(401, detail="Mode is not valid")
 
+    if before is not None and after is not None:
+        raise HTTPException(400, detail="Use either before or after, not both")
+
     filter_field = (
         db_models.ChatHistory.document_id
         if tp == "document"
@@ -38,18 +61,18 @@ async def get_chat(
     )
 
     if feynman_level:
-        db_chat = (
-            db.query(db_models.ChatHistory)
+        db_chat = await db.scalar(
+            select(db_models.ChatHistory)
             .filter(filter_field == component_id)
             .filter(db_models.ChatHistory.chat_mode == feynman_level)
-            .first()
+            .limit(1)
         )
     else:
-        db_chat = (
-            db.query(db_models.ChatHistory)
+        db_chat = await db.scalar(
+            select(db_models.ChatHistory)
             .filter(filter_field == component_id)
             .filter(db_models.ChatHistory.chat_mode == mode)
-            .first()
+            .limit(1)
         )
 
     if not db_chat:
@@ -66,23 +89,26 @@ async def get_chat(
 
         db_chat = db_models.ChatHistory(**new_chat_kwargs)
         db.add(db_chat)
-        db.commit()
-        db.refresh(db_chat)
+        await db.commit()
+        await db.refresh(db_chat)
 
-    return {
-        "messages": [
-            ChatOutput(sender=m["sender"], text=m["text"])
-            for m in (db_chat.messages or [])
-        ]
-    }
+    rows, has_more = await load_chat_page(db, db_chat.id, limit, before, after)
+
+    return ChatPageOut(
+        messages=[
+            ChatOutput(seq=seq, sender=sender, text=text) for seq, sender, text in rows
+        ],
+        total=db_chat.message_count,
+        has_more=has_more,
+    )
 
 
 @router.websocket("/stream")
-async def websocket_chat(
-    websocket: WebSocket,
-    db: Session = Depends(get_db),
-):
+async def websocket_chat(websocket: WebSocket):
+    # sessions are opened per turn rather than per socket, so idle chat tabs
+    # and in-flight LLM streams do not hold pooled connections
     await websocket.accept()
+    compaction: Optional[asyncio.Task] = None
 
     try:
         init_data = await websocket.receive_text()
@@ -93,17 +119,56 @@ async def websocket_chat(
             await websocket.close()
             return
 
-        db_chat = get_or_create_chat_history(db, chat_input)
+        async with AsyncSessionLocal() as db:
+            db_chat = await get_or_create_chat_history(db, chat_input)
+            history = await load_chat_messages(
+                db, db_chat.id, after_seq=db_chat.summarized_through_seq
+            )
 
         print(chat_input.feynman)
-        conversation, memory = initialize_chain(
-            db_chat, chat_input.mode, chat_input.feynman
+        llm, memory = initialize_chain(
+            history,
+            chat_input.mode,
+            chat_input.feynman,
+            db_chat.summary,
+            db_chat.summarized_through_seq,
         )
 
+        async def compact_memory():
+            # bounded passes until the overflow is folded; each one is saved,
+            # so a pass cut short by a disconnect only loses itself
+            try:
+                while await memory.acompact(llm):
+                    async with AsyncSessionLocal() as db:
+                        await save_chat_summary(
+                            db,
+                            db_chat.id,
+                            memory.summary,
+                            memory.summarized_through_seq,
+                        )
+            except Exception as e:
+                print(f"Chat summary failed: {e}")
+
+        def schedule_compaction():
+            # at most one compaction in flight per session
+            nonlocal compaction
+            if compaction is None or compaction.done():
+                compaction = asyncio.create_task(compact_memory())
+
+        # a long history that was never summarized is folded in the
+        # background; until then the prompt carries only what fits
+        schedule_compaction()
+
+        # the session's document vectors, loaded on the first turn
+        vector_slices = {}
+
         while True:
             user_input = await websocket.receive_text()
 
-            docs, notes, error = load_context(chat_input, db, user_input)
+            async with AsyncSessionLocal() as db:
+                docs, notes, error, timings = await load_context(
+                    chat_input, db, user_input, vector_slices
+                )
 
             full_prompt_messages = []
 
@@ -115,13 +180,22 @@ async def websocket_chat(
                 )
                 await websocket.close()
                 return
-            print("documents are found")
 
-            doc_context = "\n\n".join([doc for doc in docs])
-            doc_system_message = SystemMessage(
-                content=f"Here are some relevant documents:\n{doc_context}"
+            docs, notes, context_tokens, duplicates = context_assembler.assemble(
+                docs, notes
             )
-            full_prompt_messages.append(doc_system_message)
+            print(
+                "documents are found "
+                + " ".join(f"{k}={v:.1f}" for k, v in timings.items())
+                + f" context_tokens={context_tokens} duplicates={duplicates}"
+            )
+
+            if docs:
+                doc_context = "\n\n".join([doc for doc in docs])
+                doc_system_message = SystemMessage(
+                    content=f"Here are some relevant documents:\n{doc_context}"
+                )
+                full_prompt_messages.append(doc_system_message)
 
             if notes:
                 note_context = "\n\n".join([note for note in notes])
@@ -130,33 +204,32 @@ async def websocket_chat(
                 )
                 full_prompt_messages.append(note_system_message)
 
-            messages = memory.chat_memory.messages
+            messages = memory.messages
             print(messages[0])
 
             full_prompt_messages.extend(messages)
             full_prompt_messages.append(HumanMessage(content=user_input))
 
-            memory.chat_memory.add_message(HumanMessage(content=user_input))
-
             full_tokens = []
 
-            async for chunk in conversation.llm.astream(full_prompt_messages):
+            async for chunk in llm.astream(full_prompt_messages):
                 token = chunk.content
                 full_tokens.append(token)
                 await websocket.send_text(token)
                 await asyncio.sleep(0)
 
             ai_response = "".join(full_tokens)
-            memory.chat_memory.add_message(AIMessage(content=ai_response))
 
-            db_chat.messages.extend(
-                [
-                    {"sender": "user", "text": user_input},
-                    {"sender": "ai", "text": ai_response},
-                ]
-            )
-            db.add(db_chat)
-            db.commit()
+            async with AsyncSessionLocal() as db:
+                user_seq, ai_seq = await append_chat_messages(
+                    db, db_chat, [("user", user_input), ("ai", ai_response)]
+                )
+            memory.add_message(user_seq, HumanMessage(content=user_input))
+            memory.add_message(ai_seq, AIMessage(content=ai_response))
+
+            # folding old turns into the summary runs alongside the next
+            # turn instead of in front of it
+            schedule_compaction()
 
     except WebSocketDisconnect:
         print("WebSocket disconnected")
@@ -165,6 +238,14 @@ async def websocket_chat(
         await websocket.send_text(json.dumps({"error": str(e)}))
         await websocket.close()
 
+    finally:
+        if compaction is not None and not compaction.done():
+            compaction.cancel()
+            try:
+                await compaction
+            except asyncio.CancelledError:
+                pass
+
 
 @router.delete("/clear/{component_id}")
 async def clear_chat_history(
@@ -172,8 +253,8 @@ async def clear_chat_history(
     tp: str,
     mode: str,
     feynman_level: Optional[str] = None,
-    _: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if tp not in ("document", "note"):
         raise HTTPException(status_code=400, detail="Invalid component type")
@@ -185,24 +266,23 @@ async def clear_chat_history(
     )
 
     if feynman_level:
-        chat = (
-            db.query(db_models.ChatHistory)
+        chat = await db.scalar(
+            select(db_models.ChatHistory)
             .filter(filter_field == component_id)
             .filter(db_models.ChatHistory.chat_mode == feynman_level)
-            .first()
+            .limit(1)
         )
     else:
-        chat = (
-            db.query(db_models.ChatHistory)
+        chat = await db.scalar(
+            select(db_models.ChatHistory)
             .filter(filter_field == component_id)
             .filter(db_models.ChatHistory.chat_mode == mode)
-            .first()
+            .limit(1)
         )
 
     if not chat:
         raise HTTPException(status_code=404, detail="Chat history not found")
 
-    chat.messages = []
-    db.commit()
+    await clear_chat_messages(db, chat)
 
     return {"detail": "Chat history cleared"}
@@ -1,61 +1,71 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from utils.user_utils import get_current_user
+from utils.user_utils import get_current_principal, invalidate_principal
 from models import schemas, db_models
-from db.session import get_db
-from models.db_models import User
+from db.session import get_async_db, get_db
 from core import security
-from models.schemas import TokenRefreshRequest, UserOut
+from models.schemas import Principal, TokenRefreshRequest, UserOut
 
 router = APIRouter()
 
 
 @router.post("/register")
-def register_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    if (
-        db.query(db_models.User)
-        .filter(db_models.User.username == user.username)
-        .first()
+async def register_user(
+    user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)
+):
+    if await db.scalar(
+        select(db_models.User.id).filter(db_models.User.username == user.username)
     ):
         raise HTTPException(status_code=400, detail="Username already exists")
-    if db.query(db_models.User).filter(db_models.User.email == user.email).first():
+    if await db.scalar(
+        select(db_models.User.id).filter(db_models.User.email == user.email)
+    ):
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_pw = security.hash_password(user.password)
+    hashed_pw = await security.password_hasher.hash(user.password)
     db_user = db_models.User(
         username=user.username, email=user.email, hashed_password=hashed_pw
     )
 
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
 
     return {"detail": "Registered"}
 
 
 @router.post("/login")
-def login(form_data: schemas.UserLogin, db: Session = Depends(get_db)):
-    db_user = (
-        db.query(db_models.User)
-        .filter(db_models.User.username == form_data.username)
-        .first()
+async def login(form_data: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(
+        select(db_models.User).filter(db_models.User.username == form_data.username)
     )
-    if not db_user or not security.verify_password(
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = await security.password_hasher.verify_and_update(
         form_data.password, db_user.hashed_password
-    ):
+    )
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # stored with a different BCRYPT_ROUNDS; upgrade while we have the password
+    if new_hash:
+        db_user.hashed_password = new_hash
+
     access_token = security.create_access_token(data={"sub": str(db_user.id)})
     refresh_token = security.create_refresh_token(data={"sub": str(db_user.id)})
 
-    db.query(db_models.RefreshToken).filter(
-        db_user.id == db_models.RefreshToken.user_id
-    ).delete()
+    await db.execute(
+        delete(db_models.RefreshToken).where(
+            db_models.RefreshToken.user_id == db_user.id
+        )
+    )
 
     # store refresh token
     db_token = db_models.RefreshToken(token=refresh_token, user_id=db_user.id)
     db.add(db_token)
-    db.commit()
+    await db.commit()
 
     return UserOut(
         username=db_user.username,
@@ -91,12 +101,14 @@ def refresh_token(token_data: TokenRefreshRequest, db: Session = Depends(get_db)
 
 
 @router.post("/auto_login")
-async def auto_login(token: TokenRefreshRequest, db: Session = Depends(get_db)):
-    db_user = (
-        db.query(db_models.User)
+async def auto_login(
+    token: TokenRefreshRequest, db: AsyncSession = Depends(get_async_db)
+):
+    db_user = await db.scalar(
+        select(db_models.User)
         .join(db_models.RefreshToken)
         .filter(db_models.RefreshToken.token == token.refresh_token)
-        .first()
+        .limit(1)
     )
 
     if not db_user:
@@ -115,7 +127,7 @@ async def auto_login(token: TokenRefreshRequest, db: Session = Depends(get_db)):
 @router.post("/logout")
 def logout(
     token_data: TokenRefreshRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: Principal = Depends(get_current_principal),
     db: Session = Depends(get_db),
 ):
     db_token = (
@@ -133,6 +145,7 @@ def logout(
         .delete()
     )
     db.commit()
+    invalidate_principal(current_user.id)
 
     if not deleted:
         raise HTTPException(status_code=404, detail="Token not found")
@@ -1,27 +1,67 @@
 from annotated_types import doc
-from fastapi import UploadFile, File, Depends, APIRouter, HTTPException, status
-from sqlalchemy.orm import Session, joinedload
-import shutil
+from fastapi import (
+    UploadFile,
+    File,
+    Depends,
+    APIRouter,
+    HTTPException,
+    Query,
+    Request,
+    status,
+)
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+import asyncio
 import os
-from uuid import uuid4
-from fastapi.responses import StreamingResponse, Response
+import re
+from fastapi.responses import Response
 from starlette.status import HTTP_204_NO_CONTENT
 
 from services.chroma_db import (
     chroma_remove_document,
+    chroma_drop_workspace,
     chroma_remove_note,
-    chroma_save_document,
     chroma_save_note,
+    chroma_search_workspace,
+    embedding_provider,
+)
+from core.config import settings
+from services.blob_store import (
+    commit_blob,
+    file_sha256,
+    is_blob_shared,
+    remove_tmp,
+    save_upload_blob,
+    write_chunk,
+)
+from services.embedding_cache import drop_cached_chunks
+from services.ingestion import enqueue_document
+from services.lexical_index import remove_lexical_index
+from services.page_text import remove_page_text
+from services.uploads import (
+    advance_upload,
+    claim_completed_upload,
+    create_upload_session,
+    get_upload_session,
+    upload_rejection,
 )
 from models import db_models
-from models.db_models import User, Document
-from db.session import get_db
-from utils.user_utils import get_current_user
+from models.db_models import Document, IngestionJob, IngestionStatusEnum
+from db.session import get_async_db
+from utils.file_response import conditional_file_response
+from utils.user_utils import get_current_principal
 from models.schemas import (
     DocumentListOut,
     DocumentOut,
+    DocumentStatusOut,
     NoteAdd,
     NoteUpdate,
+    Principal,
+    SearchHit,
+    SearchOut,
+    UploadInit,
+    UploadSessionOut,
     WorkspaceCreate,
     NoteOut,
     WorkspaceListOut,
@@ -36,30 +76,31 @@ router = APIRouter()
 @router.post("")
 async def create_workspace(
     workspace_create: WorkspaceCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
     db_workspace = db_models.Workspace(
         user_id=current_user.id, name=workspace_create.name
     )
 
     db.add(db_workspace)
-    db.commit()
-    db.refresh(db_workspace)
+    await db.commit()
 
     return {}
 
 
 @router.get("/all")
 async def get_workspaces(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
     workspaces = (
-        db.query(db_models.Workspace)
-        .filter(db_models.Workspace.user_id == current_user.id)
-        .all()
-    )
+        await db.scalars(
+            select(db_models.Workspace).filter(
+                db_models.Workspace.user_id == current_user.id
+            )
+        )
+    ).all()
 
     return WorkspaceListOut(
         workspaces=[WorkspaceOut.model_validate(workspace) for workspace in workspaces]
@@ -69,18 +110,17 @@ async def get_workspaces(
 @router.get("/{workspace_id}")
 async def get_workspace(
     workspace_id: int,
-    _: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    workspace = (
-        db.query(db_models.Workspace)
+    workspace = await db.scalar(
+        select(db_models.Workspace)
         .options(
-            joinedload(db_models.Workspace.document).joinedload(
+            selectinload(db_models.Workspace.document).selectinload(
                 db_models.Document.notes
             )
         )
         .filter(db_models.Workspace.id == workspace_id)
-        .first()
     )
 
     if not workspace:
@@ -101,120 +141,380 @@ async def get_workspace(
 @router.delete("/{workspace_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_workspace(
     workspace_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    workspace = (
-        db.query(db_models.Workspace)
+    # the ORM detaches the workspace's documents on delete, so load them now
+    # rather than lazily, which an AsyncSession cannot do
+    workspace = await db.scalar(
+        select(db_models.Workspace)
+        .options(selectinload(db_models.Workspace.document))
         .filter(
             db_models.Workspace.id == workspace_id,
             db_models.Workspace.user_id == current_user.id,
         )
-        .first()
     )
 
     if not workspace:
         raise HTTPException(status_code=404, detail="Workspace not found")
 
-    db.delete(workspace)
-    db.commit()
+    await db.delete(workspace)
+    await db.commit()
+
+    # the workspace's vectors are whole collections of their own; a job still
+    # indexing one of its documents drops what it writes after this
+    await asyncio.to_thread(chroma_drop_workspace, workspace_id)
 
     return Response(status_code=HTTP_204_NO_CONTENT)
 
 
+@router.get("/{workspace_id}/search")
+async def search_workspace(
+    workspace_id: int,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    await _get_user_workspace(db, workspace_id, current_user.id)
+
+    # embedded on the query pool, then the query itself off the event loop
+    await embedding_provider.aencode_query(q)
+    hits = await asyncio.to_thread(chroma_search_workspace, workspace_id, q, limit)
+
+    doc_ids = {metadata["doc_id"] for _, _, _, metadata, _ in hits}
+    names = dict(
+        (
+            await db.execute(
+                select(Document.id, Document.filename).filter(Document.id.in_(doc_ids))
+            )
+        ).all()
+    )
+
+    return SearchOut(
+        hits=[
+            SearchHit(
+                kind=kind,
+                document_id=metadata["doc_id"],
+                document_name=names[metadata["doc_id"]],
+                page_num=metadata.get("page_num"),
+                chunk_num=metadata.get("chunk_num"),
+                note_id=int(id) if kind == "note" else None,
+                text=text,
+                distance=distance,
+            )
+            for kind, id, text, metadata, distance in hits
+            # vectors of a document deleted while the query ran
+            if metadata["doc_id"] in names
+        ]
+    )
+
+
 # DOCUMENT
 
 
+async def _get_user_workspace(
+    db: AsyncSession, workspace_id: int, user_id: int
+) -> db_models.Workspace:
+    workspace = await db.scalar(
+        select(db_models.Workspace).filter(
+            db_models.Workspace.id == workspace_id,
+            db_models.Workspace.user_id == user_id,
+        )
+    )
+
+    if not workspace:
+        raise HTTPException(status_code=404, detail="Workspace not found")
+
+    return workspace
+
+
+async def _create_document(
+    db: AsyncSession,
+    workspace_id: int,
+    filename: str,
+    file_path: str,
+    content_hash: str,
+    file_size: int,
+):
+    doc = Document(
+        filename=filename,
+        file_path=file_path,
+        content_hash=content_hash,
+        file_size=file_size,
+        workspace_id=workspace_id,
+    )
+    job = await enqueue_document(db, doc)
+
+    return {"document_id": doc.id, "job_id": job.id, "status": job.status.value}
+
+
 @router.post("/documents/upload/{workspace_id}")
 async def upload_document(
     workspace_id: int,
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    workspace = (
-        db.query(db_models.Workspace)
-        .filter(
-            db_models.Workspace.id == workspace_id,
-            db_models.Workspace.user_id == current_user.id,
+    workspace = await _get_user_workspace(db, workspace_id, current_user.id)
+
+    # the multipart body is already spooled by now; large files should use
+    # the chunked upload endpoints, which are checked before any data is sent
+    rejection = await upload_rejection(db, current_user.id, file.size or 0)
+    if rejection:
+        raise HTTPException(status_code=413, detail=rejection)
+
+    file_ext = os.path.splitext(file.filename)[1]
+    content_hash, full_path, file_size = await save_upload_blob(file, file_ext)
+
+    return await _create_document(
+        db, workspace.id, file.filename, full_path, content_hash, file_size
+    )
+
+
+# resumable uploads: initiate, PUT chunks at increasing offsets, complete
+
+
+def _upload_session_out(session: db_models.UploadSession) -> UploadSessionOut:
+    return UploadSessionOut(
+        upload_id=session.id,
+        size=session.size,
+        received=session.received,
+        chunk_size=settings.UPLOAD_CHUNK_MAX_BYTES,
+    )
+
+
+async def _get_upload_session(
+    db: AsyncSession, upload_id: str, user_id: int
+) -> db_models.UploadSession:
+    session = await get_upload_session(db, upload_id, user_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+
+@router.post("/documents/uploads/{workspace_id}")
+async def initiate_upload(
+    workspace_id: int,
+    upload: UploadInit,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    await _get_user_workspace(db, workspace_id, current_user.id)
+
+    if upload.size <= 0:
+        raise HTTPException(status_code=400, detail="Size must be positive")
+    if not re.fullmatch(r"[0-9a-fA-F]{64}", upload.sha256):
+        raise HTTPException(status_code=400, detail="sha256 must be 64 hex digits")
+
+    session, rejection = await create_upload_session(
+        db, current_user.id, workspace_id, upload
+    )
+    if rejection:
+        raise HTTPException(status_code=413, detail=rejection)
+
+    return _upload_session_out(session)
+
+
+@router.get("/documents/uploads/{upload_id}")
+async def get_upload(
+    upload_id: str,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    session = await _get_upload_session(db, upload_id, current_user.id)
+
+    return _upload_session_out(session)
+
+
+@router.put("/documents/uploads/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    session = await _get_upload_session(db, upload_id, current_user.id)
+
+    if offset != session.received:
+        raise HTTPException(
+            status_code=409, detail=f"Expected offset {session.received}"
         )
-        .first()
+
+    limit = min(settings.UPLOAD_CHUNK_MAX_BYTES, session.size - offset)
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail=f"Chunk exceeds {limit} bytes")
+
+    # release the connection while the body streams in
+    await db.commit()
+
+    try:
+        written = await write_chunk(session.tmp_path, offset, request.stream(), limit)
+    except ValueError:
+        raise HTTPException(status_code=413, detail=f"Chunk exceeds {limit} bytes")
+
+    if not await advance_upload(db, session, offset, written):
+        raise HTTPException(status_code=409, detail="Chunk was already written")
+
+    return _upload_session_out(session)
+
+
+@router.post("/documents/uploads/{upload_id}/complete")
+async def complete_upload(
+    upload_id: str,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    session = await _get_upload_session(db, upload_id, current_user.id)
+
+    if session.received != session.size:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {session.received} of {session.size} bytes",
+        )
+
+    if not await claim_completed_upload(db, session):
+        raise HTTPException(status_code=409, detail="Upload is already completed")
+
+    workspace_id, filename, file_size, tmp_path = (
+        session.workspace_id,
+        session.filename,
+        session.size,
+        session.tmp_path,
     )
 
-    if not workspace:
-        raise HTTPException(status_code=404, detail="Workspace not found")
+    try:
+        content_hash = await asyncio.to_thread(file_sha256, tmp_path)
+        if content_hash != session.sha256:
+            raise HTTPException(status_code=422, detail="Checksum mismatch")
 
-    file_id = str(uuid4())
-    file_ext = os.path.splitext(file.filename)[1]
-    saved_name = f"{file_id}{file_ext}"
-    upload_path = f"uploads/user_{current_user.id}"
-    os.makedirs(upload_path, exist_ok=True)
+        file_ext = os.path.splitext(filename)[1]
+        full_path = await asyncio.to_thread(
+            commit_blob, tmp_path, content_hash, file_ext
+        )
+    except Exception:
+        remove_tmp(tmp_path)
+        raise
 
-    full_path = os.path.join(upload_path, saved_name)
-    with open(full_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    return await _create_document(
+        db, workspace_id, filename, full_path, content_hash, file_size
+    )
 
-    doc = Document(
-        filename=file.filename, file_path=full_path, workspace_id=workspace.id
+
+@router.get("/documents/{document_id}/status")
+async def get_document_status(
+    document_id: int,
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
+):
+    document = await db.get(Document, document_id)
+    if not document:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    job = await db.scalar(
+        select(IngestionJob)
+        .filter(IngestionJob.document_id == document_id)
+        .order_by(IngestionJob.id.desc())
+        .limit(1)
     )
-    db.add(doc)
-    db.commit()
-    db.refresh(doc)
 
-    await chroma_save_document(doc)
+    # every document gets its job in the same commit, and older documents
+    # were given one by migration, so this is a document nothing will index
+    if not job:
+        return DocumentStatusOut(
+            document_id=document_id,
+            status=IngestionStatusEnum.failed.value,
+            error="Document was never queued for ingestion",
+        )
 
-    return {"document_id": doc.id}
+    return DocumentStatusOut(
+        document_id=document_id,
+        job_id=job.id,
+        status=job.status.value,
+        pages_done=job.pages_done,
+        pages_total=job.pages_total,
+        error=job.error,
+    )
 
 
 @router.get("/documents/{document_id}/file")
-def get_document_file(
+async def get_document_file(
     document_id: int,
-    _: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    document = db.query(Document).filter(Document.id == document_id).first()
+    document = await db.get(Document, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
 
-    file_path = document.file_path
-    if not os.path.isfile(file_path):
-        raise HTTPException(status_code=404, detail="File not found on server")
+    # blobs are content-addressed, so the hash is a strong validator
+    return await conditional_file_response(
+        request,
+        document.file_path,
+        media_type="application/pdf",
+        etag=document.content_hash,
+        filename=document.filename,
+    )
+
 
-    file_like = open(file_path, mode="rb")
-    return StreamingResponse(file_like, media_type="application/pdf")
+def _remove_document_vectors(doc_id: int, workspace_id: int, note_ids: list):
+    chroma_remove_document(doc_id, workspace_id)
+    for note_id in note_ids:
+        chroma_remove_note(note_id, workspace_id)
 
 
 @router.delete("/documents/{document_id}", status_code=HTTP_204_NO_CONTENT)
 async def remove_document(
-    document_id: int, _: User = Depends(get_current_user), db: Session = Depends(get_db)
+    document_id: int,
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_document = (
-        db.query(db_models.Document)
+    # relationships the ORM touches on delete are loaded up front
+    db_document = await db.scalar(
+        select(db_models.Document)
+        .options(
+            selectinload(db_models.Document.notes),
+            selectinload(db_models.Document.chat),
+            selectinload(db_models.Document.ingestion_jobs),
+        )
         .filter(db_models.Document.id == document_id)
-        .first()
     )
 
     doc_id = db_document.id
+    workspace_id = db_document.workspace_id
     note_ids = [note.id for note in db_document.notes]
 
     if not db_document:
         raise HTTPException(status_code=404, detail="Document is not found")
 
+    # blobs are content-addressed and may back other documents
+    blob_in_use = await is_blob_shared(db, db_document)
+
     try:
-        if os.path.exists(db_document.file_path):
-            os.remove(db_document.file_path)
-        else:
-            print(f"File not found: {db_document.file_path}")
+        if not blob_in_use:
+            if os.path.exists(db_document.file_path):
+                os.remove(db_document.file_path)
+            else:
+                print(f"File not found: {db_document.file_path}")
+            remove_page_text(db_document.file_path)
+            remove_lexical_index(db_document.file_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to delete file: {str(e)}")
 
-    db.delete(db_document)
-    db.commit()
+    if db_document.content_hash and not blob_in_use:
+        await drop_cached_chunks(db, db_document.content_hash)
 
-    chroma_remove_document(doc_id)
-    if len(note_ids) > 0:
-        for note_id in note_ids:
-            chroma_remove_note(note_id)
+    await db.delete(db_document)
+    await db.commit()
+
+    # a detached document's vectors went with its workspace's collections
+    if workspace_id is not None:
+        await asyncio.to_thread(
+            _remove_document_vectors, doc_id, workspace_id, note_ids
+        )
 
     return Response(status_code=HTTP_204_NO_CONTENT)
 
@@ -225,10 +525,10 @@ async def remove_document(
 @router.get("/notes/{note_id}")
 async def get_note(
     note_id: int,
-    _: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_note = db.query(db_models.Note).filter(db_models.Note.id == note_id).first()
+    db_note = await db.get(db_models.Note, note_id)
 
     if not db_note:
         raise HTTPException(status_code=404, detail="Note is not found")
@@ -239,14 +539,14 @@ async def get_note(
 @router.post("/notes")
 async def add_note(
     note_add: NoteAdd,
-    _: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
     db_note = db_models.Note(document_id=note_add.doc, title=note_add.title)
 
     db.add(db_note)
-    db.commit()
-    db.refresh(db_note)
+    await db.commit()
+    await db.refresh(db_note)
 
     return db_note
 
@@ -254,30 +554,39 @@ async def add_note(
 @router.delete("/notes/{note_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def remove_note(
     note_id: int,
-    _: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_note = db.query(db_models.Note).filter(db_models.Note.id == note_id).first()
+    db_note = await db.scalar(
+        select(db_models.Note)
+        .options(selectinload(db_models.Note.chat))
+        .filter(db_models.Note.id == note_id)
+    )
 
     note_id = db_note.id
 
     if not db_note:
         raise HTTPException(status_code=404, detail="Note not found")
 
-    db.delete(db_note)
-    db.commit()
+    workspace_id = await db.scalar(
+        select(Document.workspace_id).filter(Document.id == db_note.document_id)
+    )
+
+    await db.delete(db_note)
+    await db.commit()
 
-    chroma_remove_note(note_id)
+    if workspace_id is not None:
+        await asyncio.to_thread(chroma_remove_note, note_id, workspace_id)
 
 
 @router.put("/notes/{note_id}", status_code=status.HTTP_200_OK)
 async def update_note(
     note_id: int,
     note_update: NoteUpdate,
-    _: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    _: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    db_note = db.query(db_models.Note).filter(db_models.Note.id == note_id).first()
+    db_note = await db.get(db_models.Note, note_id)
 
     if not db_note:
         raise HTTPException(status_code=404, detail="Note not found")
@@ -285,7 +594,20 @@ async def update_note(
     for field, value in note_update.dict(exclude_unset=True).items():
         setattr(db_note, field, value)
 
-    db.commit()
-    db.refresh(db_note)
+    await db.commit()
 
-    chroma_save_note(db_note.id, db_note.document_id, note_update.content)
+    workspace_id = await db.scalar(
+        select(Document.workspace_id).filter(Document.id == db_note.document_id)
+    )
+    if workspace_id is None:
+        # the note's document was detached from a deleted workspace
+        return
+
+    # embedding the note blocks, keep it off the event loop
+    await asyncio.to_thread(
+        chroma_save_note,
+        db_note.id,
+        db_note.document_id,
+        workspace_id,
+        note_update.content,
+    )
@@ -0,0 +1,83 @@
+"""Per-chunk vs. batched Chroma writes for one synthetic document.
+
+Run from ``app/``::
+
+    python -m benchmarks.bench_chroma_writes --pages 300
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import chromadb
+from pypdf import PdfReader
+
+from benchmarks.synthetic_pdf import make_synthetic_pdf
+from services.chroma_db import ChromaWriteBuffer, embedding_model, splitter
+
+
+def _prepare_rows(pdf_path: str):
+    rows = []
+    for page_index, page in enumerate(PdfReader(pdf_path).pages):
+        chunks = splitter.split_text(page.extract_text())
+        if not chunks:
+            continue
+
+        embeddings = embedding_model.encode(chunks, convert_to_numpy=True).tolist()
+        for j, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
+            metadata = {"doc_id": 1, "page_num": page_index, "chunk_num": j}
+            rows.append((f"1_{page_index}_{j}", chunk, embedding, metadata))
+    return rows
+
+
+def _per_chunk(collection, rows):
+    for id, document, embedding, metadata in rows:
+        collection.add(
+            ids=[id], documents=[document], embeddings=[embedding], metadatas=[metadata]
+        )
+
+
+def _batched(collection, rows, batch_size):
+    buffer = ChromaWriteBuffer(collection, batch_size=batch_size)
+    for row in rows:
+        buffer.add(*row)
+    buffer.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), args.pages)
+
+        # embeddings are computed once up front so only the writes are timed
+        rows = _prepare_rows(pdf_path)
+        print(f"{args.pages} pages, {len(rows)} chunks")
+
+        bench_client = chromadb.PersistentClient(path=os.path.join(tmp, "chroma"))
+        results = {}
+
+        for name, write in (
+            ("per-chunk", lambda c: _per_chunk(c, rows)),
+            ("batched", lambda c: _batched(c, rows, args.batch_size)),
+        ):
+            collection = bench_client.get_or_create_collection(name=f"bench_{name}")
+            start = time.perf_counter()
+            write(collection)
+            results[name] = time.perf_counter() - start
+            assert collection.count() == len(rows)
+
+            print(
+                f"{name:>10}: {results[name]:.2f}s "
+                f"({len(rows) / results[name]:.0f} chunks/s)"
+            )
+
+        print(f"speedup: {results['per-chunk'] / results['batched']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Event-loop lag and throughput of DB access from async handlers.
+
+``--clients`` coroutines each run ``--queries`` slow queries, the way
+concurrent requests hit the database from ``async def`` routes. A ticker
+coroutine records how late it wakes up, which is the delay every websocket
+stream in the worker would see. The run is repeated with the synchronous
+``Session`` called on the loop (the old behaviour) and with ``AsyncSession``.
+
+The slow query is ``pg_sleep`` on Postgres and a recursive CTE on SQLite.
+Without ``--database-url`` a throwaway SQLite file is used.
+
+Run from ``app/``::
+
+    python -m benchmarks.bench_db_event_loop --clients 20 --queries 10
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.session import to_async_url
+
+
+def _slow_query(database_url: str, query_ms: float):
+    if database_url.startswith("postgresql"):
+        return text("SELECT pg_sleep(:seconds)"), {"seconds": query_ms / 1000}
+
+    # roughly 1ms of work per 2k rows, close enough for a relative comparison
+    return (
+        text(
+            "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n "
+            "WHERE i < :rows) SELECT count(*) FROM n"
+        ),
+        {"rows": int(query_ms * 2_000)},
+    )
+
+
+async def _measure(run_client, clients: int, tick_ms: float):
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        interval = tick_ms / 1000
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append((time.perf_counter() - start - interval) * 1000)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+
+    lags.sort()
+    return {
+        "elapsed_s": elapsed,
+        "p50_ms": statistics.median(lags),
+        "p99_ms": lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[0],
+        "max_ms": lags[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=10)
+    parser.add_argument("--query-ms", type=float, default=5.0)
+    parser.add_argument("--tick-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or "sqlite:///" + os.path.join(tmp, "bench.db")
+        query, params = _slow_query(database_url, args.query_ms)
+
+        engine = create_engine(database_url, pool_size=args.clients)
+        SyncSession = sessionmaker(bind=engine)
+
+        async def sync_client():
+            for _ in range(args.queries):
+                with SyncSession() as db:
+                    db.execute(query, params).scalar()
+                await asyncio.sleep(0)
+
+        async def run_async():
+            async_engine = create_async_engine(
+                to_async_url(database_url), pool_size=args.clients
+            )
+            AsyncSession = async_sessionmaker(async_engine)
+
+            async def async_client():
+                for _ in range(args.queries):
+                    async with AsyncSession() as db:
+                        (await db.execute(query, params)).scalar()
+
+            try:
+                return await _measure(async_client, args.clients, args.tick_ms)
+            finally:
+                await async_engine.dispose()
+
+        results = {
+            "sync": asyncio.run(_measure(sync_client, args.clients, args.tick_ms)),
+            "async": asyncio.run(run_async()),
+        }
+        engine.dispose()
+
+    total = args.clients * args.queries
+    for name, result in results.items():
+        print(
+            f"{name:>5}: {total / result['elapsed_s']:.0f} queries/s "
+            f"({result['elapsed_s']:.2f}s), loop lag p50 {result['p50_ms']:.1f}ms "
+            f"p99 {result['p99_ms']:.1f}ms max {result['max_ms']:.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Event-loop lag while a document is ingested in the same process.
+
+A ticker coroutine sleeps for ``--tick-ms`` in a loop and records how late it
+wakes up, which is what a concurrent chat stream would experience. The upload
+runs once with embeddings computed inline on the loop (the old behaviour) and
+once through ``embedding_executor``.
+
+Run from ``app/``::
+
+    python -m benchmarks.bench_event_loop_lag --pages 100
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from types import SimpleNamespace
+
+import chromadb
+
+from benchmarks.synthetic_pdf import make_synthetic_pdf
+from services import chroma_db
+
+
+class _InlineEmbeddingExecutor(chroma_db.EmbeddingExecutor):
+    async def encode(self, texts):
+        return self.encode_sync(texts)
+
+
+async def _measure(doc, tick_ms: float):
+    lags = []
+    done = asyncio.Event()
+
+    async def ticker():
+        interval = tick_ms / 1000
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append((time.perf_counter() - start - interval) * 1000)
+
+    ticker_task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await chroma_db.chroma_save_document(doc)
+    elapsed = time.perf_counter() - start
+    done.set()
+    await ticker_task
+
+    lags.sort()
+    return {
+        "elapsed_s": elapsed,
+        "p50_ms": statistics.median(lags),
+        "p99_ms": lags[int(len(lags) * 0.99) - 1] if len(lags) > 1 else lags[0],
+        "max_ms": lags[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--tick-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    executors = {
+        "inline": _InlineEmbeddingExecutor(
+            chroma_db.embedding_model,
+            workers=1,
+            batch_size=chroma_db.settings.EMBEDDING_BATCH_SIZE,
+        ),
+        "executor": chroma_db.embedding_executor,
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), args.pages)
+        bench_client = chromadb.PersistentClient(path=os.path.join(tmp, "chroma"))
+
+        for i, (name, executor) in enumerate(executors.items()):
+            # keep the benchmark's vectors out of the real store
+            chroma_db.client = bench_client
+            chroma_db.embedding_executor = executor
+
+            doc = SimpleNamespace(id=i + 1, workspace_id=i + 1, file_path=pdf_path)
+            result = asyncio.run(_measure(doc, args.tick_ms))
+
+            print(
+                f"{name:>8}: ingest {result['elapsed_s']:.2f}s, loop lag "
+                f"p50 {result['p50_ms']:.1f}ms p99 {result['p99_ms']:.1f}ms "
+                f"max {result['max_ms']:.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Recall of vector-only vs. fused BM25 + vector ranking over one document.
+
+Each query names a page's marker word ("page17") plus a few words from that
+page's first chunk; the chunk is the one relevant result. Exact identifiers
+like these are where embeddings alone fall short.
+
+Run from ``app/``::
+
+    python -m benchmarks.bench_hybrid_recall --pages 100
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from pypdf import PdfReader
+
+from benchmarks.synthetic_pdf import make_synthetic_pdf
+from core.config import settings
+from services.chroma_db import embedding_model, splitter
+from services.lexical_index import LexicalIndex, reciprocal_rank_fusion
+from services.vector_slice import _Matrix
+
+
+def _prepare_chunks(pdf_path: str):
+    keys, texts = [], []
+    for page_index, page in enumerate(PdfReader(pdf_path).pages):
+        for j, chunk in enumerate(splitter.split_text(page.extract_text())):
+            keys.append((page_index, j))
+            texts.append(chunk)
+    return keys, texts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--words", type=int, default=3, help="words per query")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[2, 3, 4, 5])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = make_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), args.pages)
+        keys, texts = _prepare_chunks(pdf_path)
+
+    embeddings = embedding_model.encode(texts, convert_to_numpy=True)
+    matrix = _Matrix({"documents": texts, "embeddings": embeddings})
+    index = LexicalIndex.build(settings.EMBEDDING_MODEL_NAME, zip(keys, texts))
+    rows_by_key = {key: row for row, key in enumerate(keys)}
+    print(f"{args.pages} pages, {len(texts)} chunks")
+
+    rng = random.Random(0)
+    queries = []
+    for page in range(args.pages):
+        row = rows_by_key[(page, 0)]
+        words = texts[row].split()[1:]
+        query = " ".join([f"page{page}"] + rng.sample(words, args.words))
+        queries.append((query, row))
+
+    candidates = settings.RETRIEVAL_CANDIDATES
+    dense_hits = {k: 0 for k in args.top_k}
+    hybrid_hits = {k: 0 for k in args.top_k}
+    dense_time = hybrid_time = 0.0
+
+    query_vectors = embedding_model.encode(
+        [query for query, _ in queries], convert_to_numpy=True
+    ).astype(np.float32)
+
+    for (query, relevant), vector in zip(queries, query_vectors):
+        start = time.perf_counter()
+        dense = matrix.ranked(vector, candidates).tolist()
+        dense_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        lexical = [rows_by_key[key] for key in index.top_k(query, candidates)]
+        fused = reciprocal_rank_fusion([dense, lexical], settings.RETRIEVAL_RRF_K)
+        hybrid_time += time.perf_counter() - start
+
+        for k in args.top_k:
+            dense_hits[k] += relevant in dense[:k]
+            hybrid_hits[k] += relevant in fused[:k]
+
+    n = len(queries)
+    for k in args.top_k:
+        print(
+            f"recall@{k}: vector {dense_hits[k] / n:.2f}, "
+            f"hybrid {hybrid_hits[k] / n:.2f}"
+        )
+    print(
+        f"ranking per query: vector {dense_time / n * 1000:.3f} ms, "
+        f"bm25 + fusion {hybrid_time / n * 1000:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
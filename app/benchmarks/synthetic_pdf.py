@@ -0,0 +1,68 @@
+import random
+
+_VOCABULARY = (
+    "theorem proof energy momentum cell membrane protein market demand supply "
+    "equation integral derivative vector matrix article clause contract court "
+    "history empire revolution language grammar syntax algorithm complexity "
+    "network protocol entropy temperature pressure volume reaction catalyst"
+).split()
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_synthetic_pdf(
+    path: str, pages: int, words_per_page: int = 400, seed: int = 0
+) -> str:
+    """Writes a text-only PDF with ``pages`` pages of pseudo-random prose."""
+    rng = random.Random(seed)
+
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page object ids are known
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+
+    for page in range(pages):
+        words = [rng.choice(_VOCABULARY) for _ in range(words_per_page)]
+        words[0] = f"page{page}"
+        text = " ".join(words)
+        lines = [_escape(text[i : i + 95]) for i in range(0, len(text), 95)]
+        stream = (
+            "BT /F1 9 Tf 40 780 Td 11 TL "
+            + " ".join(f"({line}) '" for line in lines)
+            + " ET"
+        )
+
+        page_id = len(objects) + 1
+        page_ids.append(page_id)
+        objects.append(
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {page_id + 1} 0 R >>"
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{i} 0 obj\n{body}\nendobj\n".encode("latin-1")
+
+    xref_offset = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode()
+
+    with open(path, "wb") as f:
+        f.write(out)
+
+    return path
@@ -8,6 +8,97 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # existing hashes of a different cost are rehashed on the next login
+    BCRYPT_ROUNDS: int = 12
+    # bcrypt runs on its own threads; requests beyond the queue get a 503
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 32
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 2
+
+    # authenticated users by token subject; the TTL bounds how long another
+    # process can serve a user that was deleted elsewhere
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+
+    # per engine; the sync and async engines each keep their own pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+
+    # "gemini", or "fake" / "record" / "replay" for offline load testing
+    LLM_PROVIDER: str = "gemini"
+    LLM_MODEL: str = "gemini-2.5-flash"
+    LLM_TEMPERATURE: float = 0.7
+    LLM_VERBOSE: bool = False
+    FAKE_LLM_TTFT_MS: float = 300.0
+    FAKE_LLM_TOKENS_PER_SECOND: float = 60.0
+    FAKE_LLM_RESPONSE_TOKENS: int = 200
+    LLM_RECORDING_PATH: str = "llm_recordings/sessions.jsonl"
+    LLM_REPLAY_SPEED: float = 1.0
+
+    # chat memory: recent turns kept verbatim within the budget, older ones
+    # folded into a running summary
+    MEMORY_TOKEN_BUDGET: int = 3000
+    MEMORY_RECENT_TURNS: int = 6
+    # messages folded per summarization call, so one call stays small
+    MEMORY_COMPACT_BATCH: int = 12
+
+    # retrieved chunks and notes per turn; near-duplicates (this share of
+    # their word shingles already in the prompt) are dropped first
+    CHAT_CONTEXT_TOKEN_BUDGET: int = 1500
+    CHAT_CONTEXT_DUPLICATE_THRESHOLD: float = 0.8
+
+    # uploads; open resumable sessions count against the quota at their full size
+    UPLOAD_MAX_BYTES: int = 100 * 1024 * 1024
+    UPLOAD_CHUNK_MAX_BYTES: int = 8 * 1024 * 1024
+    UPLOAD_USER_QUOTA_BYTES: int = 1024 * 1024 * 1024
+    UPLOAD_SESSION_TTL_SECONDS: int = 24 * 3600
+
+    # background document ingestion
+    INGESTION_WORKERS: int = 2
+    INGESTION_POLL_INTERVAL_SECONDS: float = 2.0
+    INGESTION_STALE_AFTER_SECONDS: int = 600
+    # how often a busy worker marks its job as alive; well under the above
+    INGESTION_HEARTBEAT_SECONDS: float = 60.0
+    # a job whose worker keeps dying on it (e.g. a file that crashes the
+    # parser) is failed after this many attempts instead of requeued again
+    INGESTION_MAX_ATTEMPTS: int = 3
+
+    # capped at the client's get_max_batch_size()
+    CHROMA_WRITE_BATCH_SIZE: int = 1000
+    # vectors live in per-workspace collections; handles kept open, and the
+    # memory Chroma may spend on loaded indexes (0 = no limit)
+    CHROMA_OPEN_COLLECTIONS: int = 256
+    CHROMA_MEMORY_LIMIT_BYTES: int = 0
+
+    EMBEDDING_MODEL_NAME: str = (
+        "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    )
+    EMBEDDING_WORKERS: int = 1
+    EMBEDDING_BATCH_SIZE: int = 64
+    # chat and search queries get their own threads, so they never wait
+    # behind ingestion batches queued on the pool above
+    QUERY_EMBEDDING_WORKERS: int = 1
+    QUERY_EMBEDDING_CACHE_SIZE: int = 2048
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 3600
+
+    # in-memory per-session copies of a document's vectors are reloaded at
+    # least this often, to pick up changes made by other processes
+    VECTOR_SLICE_MAX_AGE_SECONDS: int = 300
+
+    # document chunks are ranked by embedding distance and by BM25, the two
+    # lists cut to RETRIEVAL_CANDIDATES and merged with reciprocal rank fusion
+    RETRIEVAL_TOP_K: int = 4
+    RETRIEVAL_CANDIDATES: int = 20
+    RETRIEVAL_RRF_K: int = 60
+
+    # 0 disables the process pool and parses pages sequentially
+    PDF_PARSE_WORKERS: int = 0
+    PDF_PARSE_PAGES_PER_TASK: int = 16
+    PDF_PARALLEL_MIN_PAGES: int = 64
+
     class Config:
         env_file = ".env"
 
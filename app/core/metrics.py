@@ -0,0 +1,102 @@
+import threading
+from typing import Callable, Dict, List, Tuple
+
+# label values in the order of the metric's ``labels``
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _label_text(labels: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labels, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram rendered in the Prometheus text format."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS_MS,
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+
+        # label values -> (bucket counts, sum, count)
+        self._series: Dict[LabelValues, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+
+        with self._lock:
+            series = {key: (list(b), s, c) for key, (b, s, c) in self._series.items()}
+
+        for values, (bucket_counts, total, count) in series.items():
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                labels = _label_text(self.labels, values, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _label_text(self.labels, values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{labels} {count}")
+
+            labels = _label_text(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {total}")
+            lines.append(f"{self.name}_count{labels} {count}")
+
+        return lines
+
+
+class Gauge:
+    """Gauge whose values are read from ``collect`` at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        collect: Callable[[], Dict[LabelValues, float]],
+        labels: Tuple[str, ...] = (),
+    ):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self.labels = labels
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for values, value in self.collect().items():
+            lines.append(f"{self.name}{_label_text(self.labels, values)} {value}")
+        return lines
+
+
+_registry: List = []
+
+
+def register(metric):
+    _registry.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
@@ -1,10 +1,20 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import jwt, JWTError
 from datetime import datetime, timedelta, timezone
 from core.config import settings
-from typing import Optional
+from typing import Optional, Tuple
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# min == max == default, so a stored hash of any other cost needs an update
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 
 def hash_password(password: str) -> str:
@@ -15,6 +25,62 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+class HashingBusyError(Exception):
+    """Raised when the password hashing queue is full."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing queue is full")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """Dedicated threads for bcrypt, so a login storm cannot take over the
+    shared threadpool that sync endpoints run on.
+
+    At most ``workers`` hashes run at once and ``queue_limit`` more may wait;
+    beyond that callers get HashingBusyError straight away.
+    """
+
+    def __init__(self, workers: int, queue_limit: int, retry_after: int):
+        self.limit = workers + queue_limit
+        self.retry_after = retry_after
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password-hash"
+        )
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self._pending >= self.limit:
+                raise HashingBusyError(self.retry_after)
+            self._pending += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self.run(pwd_context.hash, password)
+
+    async def verify_and_update(
+        self, plain: str, hashed: str
+    ) -> Tuple[bool, Optional[str]]:
+        # (valid, new hash if the stored one was made with another cost)
+        return await self.run(pwd_context.verify_and_update, plain, hashed)
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_limit=settings.PASSWORD_HASH_QUEUE_LIMIT,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS,
+)
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(
@@ -0,0 +1,72 @@
+import time
+import weakref
+
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from core.metrics import Gauge, Histogram, register
+
+checkout_wait_ms = register(
+    Histogram(
+        "db_pool_checkout_wait_ms",
+        "Time spent waiting for a pooled connection, in milliseconds.",
+        labels=("engine",),
+    )
+)
+
+# live pools by engine label; Pool.recreate() on dispose replaces the instance
+_pools = weakref.WeakValueDictionary()
+
+
+class _InstrumentedPoolMixin:
+    engine_label = "sync"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools[self.engine_label] = self
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            checkout_wait_ms.observe(
+                (time.perf_counter() - start) * 1000, self.engine_label
+            )
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    engine_label = "sync"
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+
+def _pool_stats(stat):
+    return lambda: {(label,): stat(pool) for label, pool in list(_pools.items())}
+
+
+register(
+    Gauge(
+        "db_pool_connections_in_use",
+        "Connections currently checked out of the pool.",
+        _pool_stats(lambda pool: pool.checkedout()),
+        labels=("engine",),
+    )
+)
+register(
+    Gauge(
+        "db_pool_connections_idle",
+        "Open connections waiting in the pool.",
+        _pool_stats(lambda pool: pool.checkedin()),
+        labels=("engine",),
+    )
+)
+register(
+    Gauge(
+        "db_pool_overflow",
+        "Connections open beyond pool_size; negative while the pool is not full.",
+        _pool_stats(lambda pool: pool.overflow()),
+        labels=("engine",),
+    )
+)
@@ -1,13 +1,45 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from api import routes_user, routes_chat, routes_workspace
+from core.metrics import render_metrics
+from core.security import HashingBusyError
 from db.session import Base, engine
+from services.ingestion import ingestion_pool
+from services.pdf_pages import shutdown_pdf_pool
 
 # create DB tables
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    ingestion_pool.start()
+    yield
+    ingestion_pool.stop(timeout=5)
+    shutdown_pdf_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.exception_handler(HashingBusyError)
+async def hashing_busy_handler(request: Request, exc: HashingBusyError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-in attempts, try again shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 
 # include routers
 app.include_router(routes_user.router, prefix="/api/users", tags=["Users"])
 app.include_router(routes_chat.router, prefix="/api/chat", tags=["Chat"])
 app.include_router(routes_workspace.router, prefix="/api/workspace", tags=["Workspace"])
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    return PlainTextResponse(
+        render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
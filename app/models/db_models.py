@@ -1,7 +1,17 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Enum
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Integer,
+    String,
+    ForeignKey,
+    DateTime,
+    Enum,
+    Index,
+    LargeBinary,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
-from sqlalchemy.ext.mutable import MutableList
 from db.session import Base
 from enum import Enum as PyEnum
 
@@ -24,7 +34,9 @@ class RefreshToken(Base):
     id = Column(Integer, primary_key=True, index=True)
     token = Column(String, unique=True, index=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
 
     user = relationship("User", back_populates="token")
 
@@ -36,7 +48,9 @@ class Workspace(Base):
     name = Column(String, index=True, nullable=False)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
 
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
 
     user = relationship("User", back_populates="workspace")
     document = relationship("Document", back_populates="workspace")
@@ -56,36 +70,70 @@ class ChatModeEnum(PyEnum):
 
 class ChatHistory(Base):
     __tablename__ = "chat_history"
+    __table_args__ = (
+        Index("ix_chat_history_document_id_chat_mode", "document_id", "chat_mode"),
+        Index("ix_chat_history_note_id_chat_mode", "note_id", "chat_mode"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
-    # Structured messages: [{"sender": "user"|"ai", "text": "..."}]
-    messages = Column(MutableList.as_mutable(JSON), default=list)
+    # messages live in chat_messages; last_seq only ever grows so seq values
+    # are never reused, message_count is reset when the history is cleared
+    last_seq = Column(Integer, nullable=False, default=0)
+    message_count = Column(Integer, nullable=False, default=0)
+
+    # running summary of every message up to and including summarized_through_seq
+    summary = Column(String, nullable=True)
+    summarized_through_seq = Column(Integer, nullable=False, default=0)
 
     chat_mode = Column(Enum(ChatModeEnum), nullable=False, index=True)
 
     document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"))
     note_id = Column(Integer, ForeignKey("notes.id", ondelete="CASCADE"))
 
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
 
     document = relationship("Document", back_populates="chat")
     note = relationship("Note", back_populates="chat")
 
 
+class ChatMessage(Base):
+    __tablename__ = "chat_messages"
+
+    chat_id = Column(
+        Integer, ForeignKey("chat_history.id", ondelete="CASCADE"), primary_key=True
+    )
+    seq = Column(Integer, primary_key=True)
+
+    sender = Column(String, nullable=False)  # "user" | "ai"
+    text = Column(String, nullable=False)
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+
 class Document(Base):
     __tablename__ = "documents"
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)  # e.g., "myfile.pdf"
-    file_path = Column(String, nullable=False)  # e.g., "/uploads/user_123/myfile.pdf"
-    upload_time = Column(DateTime, default=datetime.now(timezone.utc))
+    file_path = Column(String, nullable=False)  # e.g., "uploads/blobs/ab/ab12...ef.pdf"
+    content_hash = Column(String(64), index=True, nullable=True)  # sha256 hex
+    file_size = Column(BigInteger, nullable=True)  # bytes, counted against quotas
+    upload_time = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
 
     workspace_id = Column(Integer, ForeignKey("workspace.id", ondelete="CASCADE"))
 
     chat = relationship("ChatHistory", back_populates="document", uselist=False)
     workspace = relationship("Workspace", back_populates="document")
     notes = relationship("Note", back_populates="document")
+    ingestion_jobs = relationship(
+        "IngestionJob", back_populates="document", cascade="all, delete-orphan"
+    )
 
 
 class Note(Base):
@@ -94,9 +142,95 @@ class Note(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, index=True, default="")
     content = Column(String, index=True, default="")
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
 
     document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"))
 
     document = relationship("Document", back_populates="notes")
     chat = relationship("ChatHistory", back_populates="note", uselist=False)
+
+
+class IngestionStatusEnum(PyEnum):
+    queued = "queued"
+    parsing = "parsing"
+    embedding = "embedding"
+    indexed = "indexed"
+    failed = "failed"
+
+
+class IngestionJob(Base):
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(
+        Integer, ForeignKey("documents.id", ondelete="CASCADE"), index=True
+    )
+
+    status = Column(
+        Enum(IngestionStatusEnum),
+        nullable=False,
+        default=IngestionStatusEnum.queued,
+        index=True,
+    )
+    pages_done = Column(Integer, nullable=False, default=0)
+    pages_total = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    # bumped on every progress report; used to detect jobs orphaned by a dead worker
+    updated_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    document = relationship("Document", back_populates="ingestion_jobs")
+
+
+class ChunkEmbedding(Base):
+    """Chunks and vectors computed for a file's content, reused by duplicates."""
+
+    __tablename__ = "chunk_embeddings"
+    __table_args__ = (
+        UniqueConstraint("content_hash", "embedding_model", "page_num", "chunk_num"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), index=True, nullable=False)
+    embedding_model = Column(String, nullable=False)
+
+    page_num = Column(Integer, nullable=False)
+    chunk_num = Column(Integer, nullable=False)
+    text = Column(String, nullable=False)
+    embedding = Column(LargeBinary, nullable=False)  # float32 bytes
+
+
+class UploadSession(Base):
+    """A resumable upload; chunks are written to ``tmp_path`` until complete."""
+
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True)  # uuid4, handed to the client
+    user_id = Column(
+        Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False
+    )
+    workspace_id = Column(
+        Integer, ForeignKey("workspace.id", ondelete="CASCADE"), nullable=False
+    )
+
+    filename = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)  # declared up front, reserved in quota
+    sha256 = Column(String(64), nullable=False)  # declared, checked on complete
+    received = Column(BigInteger, nullable=False, default=0)
+    tmp_path = Column(String, nullable=False)
+
+    created_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    updated_at = Column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr
 from typing import List, Optional
 
 
@@ -20,6 +20,15 @@ class UserOut(BaseModel):
     access: str
 
 
+class Principal(BaseModel):
+    # the authenticated user as cached by get_current_principal
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    id: int
+    username: str
+    email: str
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -40,6 +49,14 @@ class ChatInput(BaseModel):
 class ChatOutput(BaseModel):
     sender: str
     text: str
+    seq: Optional[int] = None
+
+
+class ChatPageOut(BaseModel):
+    # oldest first; pass messages[0].seq as `before` to load the previous page
+    messages: List[ChatOutput]
+    total: int
+    has_more: bool
 
 
 class WorkspaceCreate(BaseModel):
@@ -80,3 +97,44 @@ class DocumentOut(BaseModel):
 
 class DocumentListOut(BaseModel):
     docs: List[DocumentOut]
+
+
+class SearchHit(BaseModel):
+    kind: str  # "document" | "note"
+    document_id: int
+    document_name: str
+    # set for document chunks
+    page_num: Optional[int] = None
+    chunk_num: Optional[int] = None
+    # set for notes
+    note_id: Optional[int] = None
+    text: str
+    distance: float
+
+
+class SearchOut(BaseModel):
+    # closest first
+    hits: List[SearchHit]
+
+
+class UploadInit(BaseModel):
+    filename: str
+    size: int
+    sha256: str
+
+
+class UploadSessionOut(BaseModel):
+    # resume by sending the next chunk at offset=received
+    upload_id: str
+    size: int
+    received: int
+    chunk_size: int
+
+
+class DocumentStatusOut(BaseModel):
+    document_id: int
+    job_id: Optional[int] = None
+    status: str
+    pages_done: int = 0
+    pages_total: Optional[int] = None
+    error: Optional[str] = None
@@ -0,0 +1,89 @@
+"""Moves vectors from the global ``documents`` and ``notes`` collections into
+per-workspace collections (``ws_<id>_documents``, ``ws_<id>_notes``).
+
+Vectors are copied as they are, nothing is re-embedded, and each document's
+vectors leave the global collection once they are in place, so an
+interrupted run continues where it stopped. A global collection is dropped
+when it is empty; what is left belongs to documents no longer in the
+database (see --drop-orphans).
+
+Run from ``app/``, with the API stopped::
+
+    python -m scripts.partition_collections
+"""
+
+import argparse
+
+from db.session import SessionLocal
+from models.db_models import Document
+from services import chroma_db
+
+
+def _move(legacy, kind: str, doc_id: int, workspace_id: int, batch_size: int) -> int:
+    found = legacy.get(
+        where={"doc_id": doc_id}, include=["documents", "embeddings", "metadatas"]
+    )
+    if not found["ids"]:
+        return 0
+
+    target = chroma_db.workspace_collection(workspace_id, kind)
+    for i in range(0, len(found["ids"]), batch_size):
+        target.upsert(
+            ids=found["ids"][i : i + batch_size],
+            documents=found["documents"][i : i + batch_size],
+            embeddings=found["embeddings"][i : i + batch_size],
+            metadatas=[
+                {**metadata, "workspace_id": workspace_id}
+                for metadata in found["metadatas"][i : i + batch_size]
+            ],
+        )
+
+    legacy.delete(ids=found["ids"])
+    return len(found["ids"])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kinds", nargs="+", default=["documents", "notes"])
+    parser.add_argument(
+        "--drop-orphans",
+        action="store_true",
+        help="drop the global collections even if vectors are left",
+    )
+    args = parser.parse_args()
+
+    batch_size = chroma_db.client.get_max_batch_size()
+
+    with SessionLocal() as db:
+        # documents of a deleted workspace are detached (workspace_id NULL);
+        # their vectors stay behind with the other orphans
+        docs = (
+            db.query(Document.id, Document.workspace_id)
+            .filter(Document.workspace_id.isnot(None))
+            .order_by(Document.id)
+            .all()
+        )
+
+    for kind in args.kinds:
+        try:
+            legacy = chroma_db.client.get_collection(kind)
+        except Exception:
+            print(f"{kind}: no global collection, nothing to move")
+            continue
+
+        moved = 0
+        for doc_id, workspace_id in docs:
+            moved += _move(legacy, kind, doc_id, workspace_id, batch_size)
+        print(f"{kind}: moved {moved} vectors")
+
+        left = legacy.count()
+        if left and not args.drop_orphans:
+            print(f"{kind}: {left} vectors of deleted documents left in place")
+            continue
+
+        chroma_db.client.delete_collection(kind)
+        print(f"{kind}: dropped the global collection")
+
+
+if __name__ == "__main__":
+    main()
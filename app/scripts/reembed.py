@@ -0,0 +1,358 @@
+"""Rebuilds each workspace's ``documents`` and ``notes`` collections from the
+database.
+
+Every Document and Note is re-embedded into a shadow collection
+(``<name>__reembed``); live collections are untouched until the shadow is
+complete, then the shadow is renamed into place. Progress is checkpointed
+after every written batch, so a killed run picks up where it stopped when
+started again with the same arguments.
+
+Page text comes from the sidecar next to each blob when present (see
+services/page_text.py) and from the PDF otherwise. Chunk boundaries follow the
+model's tokenizer, so each document's lexical index is rebuilt on the way.
+
+Run from ``app/``, with the API stopped (running processes keep writing to
+the collection they opened)::
+
+    python -m scripts.reembed --model sentence-transformers/all-MiniLM-L6-v2
+
+then set EMBEDDING_MODEL_NAME to the same model before starting the API.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import time
+from functools import partial
+from typing import List, Tuple
+
+from langchain.text_splitter import TokenTextSplitter
+from pypdf import PdfReader
+from sentence_transformers import SentenceTransformer
+
+from core.config import settings
+from db.session import SessionLocal
+from models.db_models import Document, Note, Workspace
+from services import chroma_db
+from services.lexical_index import write_lexical_index
+from services.page_text import open_page_text, write_page_text
+from services.pdf_pages import _extract_page_range
+
+SHADOW_SUFFIX = "__reembed"
+
+# (id, text, metadata) ready to embed
+Row = Tuple[str, str, dict]
+
+
+class Checkpoint:
+    def __init__(self, path: str, model: str):
+        self.path = path
+        self.state = {"model": model, "collections": {}}
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+
+        if state["model"] != self.state["model"]:
+            raise SystemExit(
+                f"{self.path} belongs to a run with {state['model']}; "
+                "pass --restart to discard it"
+            )
+
+        self.state = state
+        return True
+
+    def collection(self, name: str) -> dict:
+        # "retired" is set once the swap has started, see _swap
+        return self.state["collections"].setdefault(
+            name, {"last_id": 0, "chunks": 0, "retired": None, "swapped": False}
+        )
+
+    def save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.path)
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _document_pages(file_path: str) -> List[str]:
+    page_text = open_page_text(file_path)
+    if page_text is not None:
+        with page_text:
+            return list(page_text)
+
+    pages_total = len(PdfReader(file_path).pages)
+    pages = [text for _, text in _extract_page_range(file_path, 0, pages_total)]
+
+    try:
+        write_page_text(file_path, pages)
+    except OSError as e:
+        print(f"could not write page text for {file_path}: {e}")
+
+    return pages
+
+
+def _document_rows(
+    doc_id: int, workspace_id: int, file_path: str, splitter
+) -> List[Row]:
+    rows = []
+    for page_num, text in enumerate(_document_pages(file_path)):
+        for chunk_num, chunk in enumerate(splitter.split_text(text)):
+            rows.append(
+                (
+                    f"{doc_id}_{page_num}_{chunk_num}",
+                    chunk,
+                    {
+                        "doc_id": doc_id,
+                        "workspace_id": workspace_id,
+                        "page_num": page_num,
+                        "chunk_num": chunk_num,
+                    },
+                )
+            )
+    return rows
+
+
+class Reembedder:
+    def __init__(
+        self, executor: chroma_db.EmbeddingExecutor, workers: int, flush_size: int
+    ):
+        self.executor = executor
+        self.workers = workers
+        self.flush_size = flush_size
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        # one slice per worker, encoded concurrently
+        step = max(self.executor.batch_size, -(-len(texts) // self.workers))
+        parts = await asyncio.gather(
+            *(
+                self.executor.encode(texts[i : i + step])
+                for i in range(0, len(texts), step)
+            )
+        )
+        return [embedding for part in parts for embedding in part]
+
+    async def run(self, name: str, sources, checkpoint: Checkpoint):
+        """``sources`` yields (source_id, rows) in increasing source_id order."""
+        progress = checkpoint.collection(name)
+        if progress["swapped"]:
+            print(f"{name}: already swapped in")
+            return
+        if progress.get("retired"):
+            # killed mid-swap; the shadow may already be the live collection
+            _swap(name, progress, checkpoint)
+            return
+
+        shadow = chroma_db.client.get_or_create_collection(
+            name=name + SHADOW_SUFFIX,
+            embedding_function=chroma_db.embedding_provider,
+        )
+        buffer = chroma_db.ChromaWriteBuffer(shadow)
+
+        pending: List[Row] = []
+        last_id = progress["last_id"]
+        start = time.perf_counter()
+        done = 0
+
+        async def flush():
+            nonlocal pending, done
+            if pending:
+                embeddings = await self.embed([text for _, text, _ in pending])
+                for (id, text, metadata), embedding in zip(pending, embeddings):
+                    buffer.add(id, text, embedding, metadata)
+                buffer.flush()
+
+            done += len(pending)
+            progress["chunks"] += len(pending)
+            progress["last_id"] = last_id
+            checkpoint.save()
+            pending = []
+
+            rate = done / (time.perf_counter() - start)
+            print(
+                f"{name}: {progress['chunks']} chunks, up to id {last_id}, "
+                f"{rate:.1f} chunks/s"
+            )
+
+        for source_id, rows in sources(progress["last_id"]):
+            pending.extend(rows)
+            last_id = source_id
+            # flushed at source boundaries, so the checkpoint never splits one
+            if len(pending) >= self.flush_size:
+                await flush()
+        await flush()
+
+        _swap(name, progress, checkpoint)
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name}: {done} chunks in {elapsed:.1f}s "
+            f"({done / elapsed if elapsed else 0:.1f} chunks/s this run)"
+        )
+
+
+def _collection_names() -> set:
+    # names, or collection objects on older Chroma versions
+    return {
+        getattr(collection, "name", collection)
+        for collection in chroma_db.client.list_collections()
+    }
+
+
+def _swap(name: str, progress: dict, checkpoint: Checkpoint):
+    """Renames the shadow into place; safe to run again if interrupted.
+
+    The retired name is checkpointed before anything is renamed, so a rerun
+    can tell the stages apart by which collections exist.
+    """
+    shadow = name + SHADOW_SUFFIX
+    if not progress.get("retired"):
+        progress["retired"] = f"{name}__retired_{int(time.time())}"
+        checkpoint.save()
+    retired = progress["retired"]
+
+    # Chroma renames are metadata updates; the live name is missing only
+    # between the two modify calls below
+    names = _collection_names()
+    if shadow in names:
+        if name in names:
+            chroma_db.client.get_collection(name).modify(name=retired)
+        chroma_db.client.get_collection(shadow).modify(name=name)
+    elif name not in names:
+        raise SystemExit(f"{name}: neither {name} nor {shadow} exists")
+
+    if retired in _collection_names():
+        chroma_db.client.delete_collection(retired)
+
+    progress["swapped"] = True
+    checkpoint.save()
+    print(f"{name}: swapped in the rebuilt collection")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=settings.EMBEDDING_MODEL_NAME)
+    parser.add_argument("--workers", type=int, default=settings.EMBEDDING_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=settings.EMBEDDING_BATCH_SIZE)
+    parser.add_argument(
+        "--flush-size", type=int, default=2048, help="chunks per write + checkpoint"
+    )
+    parser.add_argument("--kinds", nargs="+", default=["documents", "notes"])
+    parser.add_argument(
+        "--workspaces", type=int, nargs="+", help="workspace ids, default all"
+    )
+    parser.add_argument(
+        "--checkpoint", default=os.path.join(".chroma_store", "reembed.json")
+    )
+    parser.add_argument(
+        "--restart", action="store_true", help="drop the checkpoint and shadows"
+    )
+    args = parser.parse_args()
+
+    workspace_ids = args.workspaces
+    if not workspace_ids:
+        with SessionLocal() as db:
+            workspace_ids = [
+                id for (id,) in db.query(Workspace.id).order_by(Workspace.id)
+            ]
+    names = {
+        (workspace_id, kind): chroma_db.collection_name(workspace_id, kind)
+        for workspace_id in workspace_ids
+        for kind in args.kinds
+    }
+
+    checkpoint = Checkpoint(args.checkpoint, args.model)
+    if args.restart:
+        checkpoint.remove()
+        for name in names.values():
+            try:
+                chroma_db.client.delete_collection(name + SHADOW_SUFFIX)
+            except Exception:
+                pass
+    elif checkpoint.load():
+        print(f"resuming from {args.checkpoint}")
+
+    if args.model == settings.EMBEDDING_MODEL_NAME:
+        model, splitter = chroma_db.embedding_model, chroma_db.splitter
+    else:
+        model = SentenceTransformer(args.model, cache_folder=".embedding_model/")
+        splitter = TokenTextSplitter.from_huggingface_tokenizer(
+            tokenizer=model.tokenizer
+        )
+
+    reembedder = Reembedder(
+        chroma_db.EmbeddingExecutor(
+            model, workers=args.workers, batch_size=args.batch_size
+        ),
+        workers=args.workers,
+        flush_size=args.flush_size,
+    )
+
+    def document_sources(workspace_id: int, after_id: int):
+        with SessionLocal() as db:
+            docs = (
+                db.query(Document.id, Document.workspace_id, Document.file_path)
+                .filter(Document.workspace_id == workspace_id)
+                .filter(Document.id > after_id)
+                .order_by(Document.id)
+                .all()
+            )
+
+        for doc_id, workspace_id, file_path in docs:
+            if not os.path.isfile(file_path):
+                print(f"documents: skipping {doc_id}, {file_path} is missing")
+                yield doc_id, []
+                continue
+
+            rows = _document_rows(doc_id, workspace_id, file_path, splitter)
+            try:
+                write_lexical_index(
+                    file_path,
+                    args.model,
+                    (
+                        ((metadata["page_num"], metadata["chunk_num"]), text)
+                        for _, text, metadata in rows
+                    ),
+                )
+            except OSError as e:
+                print(f"could not write lexical index for {file_path}: {e}")
+            yield doc_id, rows
+
+    def note_sources(workspace_id: int, after_id: int):
+        with SessionLocal() as db:
+            notes = (
+                db.query(Note.id, Note.document_id, Document.workspace_id, Note.content)
+                .join(Document, Note.document_id == Document.id)
+                .filter(Document.workspace_id == workspace_id)
+                .filter(Note.id > after_id)
+                .order_by(Note.id)
+                .all()
+            )
+
+        for note_id, doc_id, workspace_id, content in notes:
+            # notes reach Chroma on their first save, empty ones never do
+            metadata = {"doc_id": doc_id, "workspace_id": workspace_id}
+            rows = [(str(note_id), content, metadata)] if content else []
+            yield note_id, rows
+
+    sources = {"documents": document_sources, "notes": note_sources}
+
+    for (workspace_id, kind), name in names.items():
+        asyncio.run(
+            reembedder.run(name, partial(sources[kind], workspace_id), checkpoint)
+        )
+
+    if all(checkpoint.collection(name)["swapped"] for name in names.values()):
+        checkpoint.remove()
+
+
+if __name__ == "__main__":
+    main()
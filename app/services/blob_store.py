@@ -0,0 +1,105 @@
+import hashlib
+import os
+from typing import AsyncIterator, Tuple
+from uuid import uuid4
+
+import anyio
+from fastapi import UploadFile
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models import db_models
+
+UPLOAD_ROOT = "uploads"
+BLOB_ROOT = os.path.join(UPLOAD_ROOT, "blobs")
+TMP_ROOT = os.path.join(UPLOAD_ROOT, "tmp")
+
+_READ_SIZE = 1024 * 1024
+
+
+def blob_path(content_hash: str, ext: str) -> str:
+    return os.path.join(BLOB_ROOT, content_hash[:2], f"{content_hash}{ext.lower()}")
+
+
+def commit_blob(tmp_path: str, content_hash: str, ext: str) -> str:
+    """Moves a fully written temp file into the content-addressed store."""
+    path = blob_path(content_hash, ext)
+
+    if os.path.exists(path):
+        # identical content is already stored, keep a single copy
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+
+    return path
+
+
+def new_tmp_path() -> str:
+    os.makedirs(TMP_ROOT, exist_ok=True)
+    return os.path.join(TMP_ROOT, f"{uuid4()}.part")
+
+
+def remove_tmp(tmp_path: str):
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_READ_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def save_upload_blob(file: UploadFile, ext: str) -> Tuple[str, str, int]:
+    """Streams an upload to disk while hashing it; returns (sha256, path, size)."""
+    tmp_path = new_tmp_path()
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with await anyio.open_file(tmp_path, "wb") as out:
+            while chunk := await file.read(_READ_SIZE):
+                digest.update(chunk)
+                size += len(chunk)
+                await out.write(chunk)
+
+        content_hash = digest.hexdigest()
+        path = await anyio.to_thread.run_sync(commit_blob, tmp_path, content_hash, ext)
+        return content_hash, path, size
+    except Exception:
+        remove_tmp(tmp_path)
+        raise
+
+
+async def write_chunk(
+    tmp_path: str, offset: int, chunks: AsyncIterator[bytes], limit: int
+) -> int:
+    """Writes a streamed chunk at ``offset``; returns the bytes written.
+
+    Raises ValueError once more than ``limit`` bytes arrive. Bytes past the
+    last acknowledged offset are simply overwritten by the next attempt.
+    """
+    written = 0
+
+    async with await anyio.open_file(tmp_path, "r+b") as out:
+        await out.seek(offset)
+        async for chunk in chunks:
+            written += len(chunk)
+            if written > limit:
+                raise ValueError("Chunk exceeds the allowed size")
+            await out.write(chunk)
+
+    return written
+
+
+async def is_blob_shared(db: AsyncSession, document: db_models.Document) -> bool:
+    others = await db.scalar(
+        select(func.count())
+        .select_from(db_models.Document)
+        .filter(db_models.Document.file_path == document.file_path)
+        .filter(db_models.Document.id != document.id)
+    )
+    return others > 0
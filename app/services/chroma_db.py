@@ -1,18 +1,41 @@
 from logging import log
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+import asyncio
+import os
+import threading
+import unicodedata
 import chromadb
+import chromadb.config
+from chromadb import Documents, EmbeddingFunction, Embeddings
 from langchain_community.document_loaders import PyPDFLoader
+from pypdf import PdfReader
 from langchain.text_splitter import TokenTextSplitter
 from sentence_transformers import SentenceTransformer
 
+from core.config import settings
 from models import db_models
+from services.lexical_index import lexical_index_path, write_lexical_index
+from services.page_text import PageTextReader, open_page_text, write_page_text
+from services.pdf_pages import iter_pdf_pages_parallel, use_parallel_parsing
+from utils.cache import TTLCache
+
+
+def _client_settings() -> chromadb.config.Settings:
+    if not settings.CHROMA_MEMORY_LIMIT_BYTES:
+        return chromadb.config.Settings()
+    # least recently used collections' indexes are unloaded past the limit
+    return chromadb.config.Settings(
+        chroma_segment_cache_policy="LRU",
+        chroma_memory_limit_bytes=settings.CHROMA_MEMORY_LIMIT_BYTES,
+    )
 
-client = chromadb.PersistentClient(path=".chroma_store/")
 
-documents_collection = client.get_or_create_collection(name="documents")
-notes_collection = client.get_or_create_collection(name="notes")
+client = chromadb.PersistentClient(path=".chroma_store/", settings=_client_settings())
 
 embedding_model = SentenceTransformer(
-    "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+    settings.EMBEDDING_MODEL_NAME,
     cache_folder=".embedding_model/",
 )
 
@@ -21,45 +44,387 @@ splitter = TokenTextSplitter.from_huggingface_tokenizer(
 )
 
 
-async def chroma_save_document(doc: db_models.Document):
-    loader = PyPDFLoader(doc.file_path)
-    page_index = 0
+def count_tokens(text: str) -> int:
+    # the embedding tokenizer is already loaded; close enough to the LLM's
+    # tokenizer for budgeting prompt sections
+    return len(embedding_model.tokenizer.encode(text, add_special_tokens=False))
 
-    async for page in loader.alazy_load():
-        chunks = splitter.split_text(page.page_content)
 
-        if not chunks:
-            page_index += 1
-            continue
+class EmbeddingExecutor:
+    """Runs ``embedding_model.encode`` on a dedicated thread pool.
+
+    Encoding releases the GIL inside torch, so awaiting it from a coroutine
+    keeps the event loop free for other requests and websocket streams.
+    """
+
+    def __init__(self, model: SentenceTransformer, workers: int, batch_size: int):
+        self.model = model
+        self.batch_size = batch_size
+        self._pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="embedding"
+        )
+
+    def encode_sync(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(
+            texts, batch_size=self.batch_size, convert_to_numpy=True
+        ).tolist()
+
+    async def encode(self, texts: List[str]) -> List[List[float]]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self.encode_sync, texts)
+
+
+embedding_executor = EmbeddingExecutor(
+    embedding_model,
+    workers=settings.EMBEDDING_WORKERS,
+    batch_size=settings.EMBEDDING_BATCH_SIZE,
+)
+
+query_embedding_executor = EmbeddingExecutor(
+    embedding_model,
+    workers=settings.QUERY_EMBEDDING_WORKERS,
+    batch_size=settings.EMBEDDING_BATCH_SIZE,
+)
+
+
+def _normalize_query(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split()).casefold()
+
+
+class EmbeddingProvider(EmbeddingFunction[Documents]):
+    """The one place texts are turned into vectors.
+
+    Collections are bound to it and every query path embeds through
+    ``encode_query``, so Chroma never falls back to its own default model.
+    Query vectors are cached under the normalized text; the model always
+    embeds the text as typed.
+    """
+
+    def __init__(self, executor: EmbeddingExecutor, query_cache: TTLCache):
+        self.executor = executor
+        self.query_cache = query_cache
+
+    def __call__(self, input: Documents) -> Embeddings:
+        return self.executor.encode_sync(list(input))
+
+    def encode_query(self, text: str) -> List[float]:
+        key = _normalize_query(text)
+
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            embedding = self.executor.encode_sync([text])[0]
+            self.query_cache.set(key, embedding)
+
+        return embedding
+
+    async def aencode_query(self, text: str) -> List[float]:
+        key = _normalize_query(text)
+
+        embedding = self.query_cache.get(key)
+        if embedding is None:
+            embedding = (await self.executor.encode([text]))[0]
+            self.query_cache.set(key, embedding)
+
+        return embedding
+
+
+embedding_provider = EmbeddingProvider(
+    query_embedding_executor,
+    TTLCache(
+        maxsize=settings.QUERY_EMBEDDING_CACHE_SIZE,
+        ttl=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+    ),
+)
+
+
+# Vectors are partitioned per workspace, one collection per kind ("documents"
+# or "notes"), so queries and deletes only touch the workspace's own index
+def collection_name(workspace_id: int, kind: str) -> str:
+    return f"ws_{workspace_id}_{kind}"
+
+
+# open collection handles, least recently used dropped first
+_collections = TTLCache(maxsize=settings.CHROMA_OPEN_COLLECTIONS)
+
+
+def workspace_collection(workspace_id: int, kind: str):
+    """The workspace's collection of ``kind``, created on first use."""
+    name = collection_name(workspace_id, kind)
+
+    collection = _collections.get(name)
+    if collection is None:
+        collection = client.get_or_create_collection(
+            name=name, embedding_function=embedding_provider
+        )
+        _collections.set(name, collection)
+
+    return collection
+
+
+def chroma_drop_workspace(workspace_id: int):
+    for kind in ("documents", "notes"):
+        name = collection_name(workspace_id, kind)
+        _collections.pop(name)
+        try:
+            client.delete_collection(name)
+        except Exception:
+            # never created
+            pass
+
+    print("workspace is removed from chroma")
+
+
+# bumped whenever a document's chunks or notes change, so in-memory copies
+# (see services/vector_slice.py) know to reload
+_document_versions = defaultdict(int)
+_document_versions_lock = threading.Lock()
+
 
-        embeddings = embedding_model.encode(chunks, convert_to_numpy=True).tolist()
+def document_version(doc_id: int) -> int:
+    return _document_versions[doc_id]
 
-        for j, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            documents_collection.add(
-                ids=[f"{doc.id}_{page_index}_{j}"],
-                documents=[chunk],
-                embeddings=[embedding],
-                metadatas=[{"doc_id": doc.id, "page_num": page_index, "chunk_num": j}],
-            )
+
+def _bump_document_version(doc_id: int):
+    with _document_versions_lock:
+        _document_versions[doc_id] += 1
+
+
+def _note_doc_id(notes_collection, note_id: int) -> Optional[int]:
+    notes = notes_collection.get(ids=[str(note_id)], include=["metadatas"])
+    if not notes["ids"]:
+        return None
+    return notes["metadatas"][0]["doc_id"]
+
+
+class ChromaWriteBuffer:
+    """Accumulates rows and writes them to a collection in large add() calls."""
+
+    def __init__(self, collection, batch_size: Optional[int] = None):
+        self.collection = collection
+        self.batch_size = min(
+            batch_size or settings.CHROMA_WRITE_BATCH_SIZE,
+            client.get_max_batch_size(),
+        )
+
+        self.ids = []
+        self.documents = []
+        self.embeddings = []
+        self.metadatas = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, id: str, document: str, embedding, metadata: dict):
+        self.ids.append(id)
+        self.documents.append(document)
+        self.embeddings.append(embedding)
+        self.metadatas.append(metadata)
+
+        if len(self.ids) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.ids:
+            return
+
+        self.collection.add(
+            ids=self.ids,
+            documents=self.documents,
+            embeddings=self.embeddings,
+            metadatas=self.metadatas,
+        )
+
+        self.ids = []
+        self.documents = []
+        self.embeddings = []
+        self.metadatas = []
+
+
+# on_progress(stage, pages_done, pages_total), stage is "parsing" or "embedding"
+ProgressCallback = Callable[[str, int, Optional[int]], None]
+
+# (chunk, embedding, metadata) as written to the documents collection
+IndexedChunk = Tuple[str, List[float], dict]
+
+
+async def _iter_document_pages(
+    file_path: str, pages_total: int, page_text: Optional[PageTextReader] = None
+) -> AsyncIterator[Tuple[int, str]]:
+    if page_text is not None:
+        for page_index in range(pages_total):
+            yield page_index, page_text.page(page_index)
+        return
+
+    if use_parallel_parsing(pages_total):
+        async for page in iter_pdf_pages_parallel(file_path, pages_total):
+            yield page
+        return
+
+    loader = PyPDFLoader(file_path)
+    page_index = 0
+    async for page in loader.alazy_load():
+        yield page_index, page.page_content
         page_index += 1
-    print("document is saved to chroma")
 
 
-def chroma_remove_document(doc_id: int):
+async def chroma_save_document(
+    doc: db_models.Document, on_progress: Optional[ProgressCallback] = None
+) -> List[IndexedChunk]:
+    # text extracted by an earlier ingestion of this blob skips PDF parsing
+    page_text = open_page_text(doc.file_path)
+    try:
+        return await _save_document_pages(doc, page_text, on_progress)
+    finally:
+        if page_text is not None:
+            page_text.close()
+
+
+async def _save_document_pages(
+    doc: db_models.Document,
+    page_text: Optional[PageTextReader],
+    on_progress: Optional[ProgressCallback],
+) -> List[IndexedChunk]:
+    if page_text is not None:
+        pages_total = len(page_text)
+    else:
+        pages_total = len(PdfReader(doc.file_path).pages)
+    if on_progress:
+        on_progress("parsing", 0, pages_total)
+
+    # parsed text, kept to write the sidecar once every page is through
+    parsed_pages: Optional[List[str]] = [] if page_text is None else None
+
+    buffer = ChromaWriteBuffer(workspace_collection(doc.workspace_id, "documents"))
+    batch_size = embedding_executor.batch_size
+
+    # chunks are gathered across pages into fixed-size batches; one batch is
+    # embedded in the background while the following pages are parsed
+    pending = []
+    in_flight = None
+    indexed: List[IndexedChunk] = []
+
+    async def drain(task):
+        rows, embeddings = await task
+        for (id, chunk, metadata), embedding in zip(rows, embeddings):
+            buffer.add(id, chunk, embedding, metadata)
+            indexed.append((chunk, embedding, metadata))
+
+        # rows are in page order, so every page before the last one is complete
+        if on_progress:
+            on_progress("embedding", rows[-1][2]["page_num"], pages_total)
+
+    async def embed(rows):
+        return rows, await embedding_executor.encode([row[1] for row in rows])
+
+    try:
+        async for page_index, text in _iter_document_pages(
+            doc.file_path, pages_total, page_text
+        ):
+            if parsed_pages is not None:
+                parsed_pages.append(text)
+            chunks = splitter.split_text(text)
+
+            for j, chunk in enumerate(chunks):
+                metadata = {
+                    "doc_id": doc.id,
+                    "workspace_id": doc.workspace_id,
+                    "page_num": page_index,
+                    "chunk_num": j,
+                }
+                pending.append((f"{doc.id}_{page_index}_{j}", chunk, metadata))
+
+            while len(pending) >= batch_size:
+                if in_flight:
+                    await drain(in_flight)
+                in_flight = asyncio.ensure_future(embed(pending[:batch_size]))
+                pending = pending[batch_size:]
+
+        if in_flight:
+            await drain(in_flight)
+        if pending:
+            await drain(embed(pending))
+    finally:
+        if in_flight and not in_flight.done():
+            in_flight.cancel()
+
+    if on_progress:
+        on_progress("embedding", pages_total, pages_total)
+
+    buffer.flush()
+    # written before the bump so reloading slices pick it up
+    await asyncio.to_thread(_save_lexical_index, doc, indexed)
+    _bump_document_version(doc.id)
+    print("document is saved to chroma")
+
+    if parsed_pages is not None:
+        try:
+            write_page_text(doc.file_path, parsed_pages)
+        except OSError as e:
+            # only a cache; the next reindex parses the PDF again
+            print(f"could not write page text for document {doc.id}: {e}")
+
+    return indexed
+
+
+def _save_lexical_index(doc: db_models.Document, chunks: List[IndexedChunk]):
+    try:
+        write_lexical_index(
+            doc.file_path,
+            settings.EMBEDDING_MODEL_NAME,
+            (
+                ((metadata["page_num"], metadata["chunk_num"]), chunk)
+                for chunk, _, metadata in chunks
+            ),
+        )
+    except OSError as e:
+        # retrieval falls back to vectors alone
+        print(f"could not write lexical index for document {doc.id}: {e}")
+
+
+def chroma_save_cached_document(doc: db_models.Document, chunks: List[IndexedChunk]):
+    buffer = ChromaWriteBuffer(workspace_collection(doc.workspace_id, "documents"))
+
+    for chunk, embedding, metadata in chunks:
+        page_num, chunk_num = metadata["page_num"], metadata["chunk_num"]
+        buffer.add(
+            f"{doc.id}_{page_num}_{chunk_num}",
+            chunk,
+            embedding,
+            {
+                "doc_id": doc.id,
+                "workspace_id": doc.workspace_id,
+                "page_num": page_num,
+                "chunk_num": chunk_num,
+            },
+        )
+
+    buffer.flush()
+    # the blob's index was written by the ingestion that filled the cache
+    if not os.path.exists(lexical_index_path(doc.file_path)):
+        _save_lexical_index(doc, chunks)
+    _bump_document_version(doc.id)
+    print("document is saved to chroma from cached embeddings")
+
+
+def chroma_remove_document(doc_id: int, workspace_id: int):
+    documents_collection = workspace_collection(workspace_id, "documents")
     docs = documents_collection.get(where={"doc_id": doc_id})
 
     if not docs["ids"]:
         return
 
     documents_collection.delete(ids=docs["ids"])
+    _bump_document_version(doc_id)
 
     print("document is removed from chroma")
 
 
-def chroma_query_documents(doc_id: int, query: str, top_k: int = 5):
-    results = documents_collection.query(
-        query_texts=[query],
-        n_results=top_k,
+def chroma_query_documents(
+    doc_id: int, workspace_id: int, query: str, top_k: Optional[int] = None
+):
+    results = workspace_collection(workspace_id, "documents").query(
+        query_embeddings=[embedding_provider.encode_query(query)],
+        n_results=top_k or settings.RETRIEVAL_TOP_K,
         where={"doc_id": doc_id},
     )
 
@@ -73,28 +438,38 @@ def chroma_query_documents(doc_id: int, query: str, top_k: int = 5):
     return top_docs[0]
 
 
-def chroma_save_note(note_id: int, doc_id: int, content: str):
-    embedding = embedding_model.encode(content, convert_to_numpy=True).tolist()
+def chroma_save_note(note_id: int, doc_id: int, workspace_id: int, content: str):
+    embedding = embedding_provider([content])[0]
 
-    notes_collection.add(
+    # upsert: the note editor saves the same note id repeatedly
+    workspace_collection(workspace_id, "notes").upsert(
         ids=str(note_id),
         documents=content,
         embeddings=embedding,
-        metadatas={"doc_id": doc_id},
+        metadatas={"doc_id": doc_id, "workspace_id": workspace_id},
     )
+    _bump_document_version(doc_id)
 
     print("note is saved to chroma")
 
 
-def chroma_remove_note(note_id: int):
-    documents_collection.delete(ids=[str(note_id)])
+def chroma_remove_note(note_id: int, workspace_id: int):
+    notes_collection = workspace_collection(workspace_id, "notes")
+    doc_id = _note_doc_id(notes_collection, note_id)
+
+    notes_collection.delete(ids=[str(note_id)])
+    if doc_id is not None:
+        _bump_document_version(doc_id)
+
     print("note is removed from chroma")
 
 
-def chroma_query_notes(doc_id: int, query: str, top_k: int = 5):
-    results = notes_collection.query(
-        query_texts=[query],
-        n_results=top_k,
+def chroma_query_notes(
+    doc_id: int, workspace_id: int, query: str, top_k: Optional[int] = None
+):
+    results = workspace_collection(workspace_id, "notes").query(
+        query_embeddings=[embedding_provider.encode_query(query)],
+        n_results=top_k or settings.RETRIEVAL_TOP_K,
         where={"doc_id": doc_id},
     )
 
@@ -108,9 +483,58 @@ def chroma_query_notes(doc_id: int, query: str, top_k: int = 5):
     return top_notes[0]
 
 
-def chroma_update_note(note_id: int, content: str):
-    new_embed = embedding_model.encode(content, convert_to_numpy=True).tolist()
+def chroma_update_note(note_id: int, workspace_id: int, content: str):
+    new_embed = embedding_provider([content])[0]
 
+    notes_collection = workspace_collection(workspace_id, "notes")
     notes_collection.update(ids=str(note_id), embeddings=new_embed, documents=content)
 
+    doc_id = _note_doc_id(notes_collection, note_id)
+    if doc_id is not None:
+        _bump_document_version(doc_id)
+
     print("note is updated at chroma")
+
+
+# (kind, id, text, metadata, distance), kind is "document" or "note"
+WorkspaceHit = Tuple[str, str, str, dict, float]
+
+
+def _query_workspace(collection, kind: str, embedding, top_k: int):
+    results = collection.query(
+        query_embeddings=[embedding],
+        n_results=top_k,
+        include=["documents", "metadatas", "distances"],
+    )
+
+    return [
+        (kind, id, text, metadata, distance)
+        for id, text, metadata, distance in zip(
+            results["ids"][0],
+            results["documents"][0],
+            results["metadatas"][0],
+            results["distances"][0],
+        )
+    ]
+
+
+def chroma_search_workspace(
+    workspace_id: int, query: str, top_k: int
+) -> List[WorkspaceHit]:
+    """Nearest chunks and notes across a workspace, closest first.
+
+    Both of the workspace's collections share the embedding model and
+    distance, so their results merge by distance.
+    """
+    embedding = embedding_provider.encode_query(query)
+
+    hits = _query_workspace(
+        workspace_collection(workspace_id, "documents"), "document", embedding, top_k
+    ) + _query_workspace(
+        workspace_collection(workspace_id, "notes"), "note", embedding, top_k
+    )
+    hits.sort(key=lambda hit: hit[4])
+
+    print("workspace is queried from chroma")
+
+    return hits[:top_k]
@@ -0,0 +1,94 @@
+from typing import Callable, FrozenSet, List, Set, Tuple
+
+from services.lexical_index import tokenize
+
+# (text, kind), kind is "document" or "note"
+_Candidate = Tuple[str, str]
+
+
+def _shingles(text: str, size: int) -> FrozenSet[Tuple[str, ...]]:
+    words = tokenize(text)
+    if len(words) <= size:
+        return frozenset([tuple(words)]) if words else frozenset()
+    return frozenset(tuple(words[i : i + size]) for i in range(len(words) - size + 1))
+
+
+class ContextAssembler:
+    """Picks the retrieved chunks and notes that go into one chat turn's prompt.
+
+    Candidates are taken best first, alternating by rank between notes and
+    document chunks. A candidate whose word shingles are mostly covered by
+    what is already picked (splitter overlap, text repeated across pages) is
+    dropped, and the rest are packed into ``token_budget``.
+    """
+
+    def __init__(
+        self,
+        token_budget: int,
+        count_tokens: Callable[[str], int],
+        duplicate_threshold: float = 0.8,
+        shingle_size: int = 5,
+    ):
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens
+        self.duplicate_threshold = duplicate_threshold
+        self.shingle_size = shingle_size
+
+    def _candidates(self, docs: List[str], notes: List[str]) -> List[_Candidate]:
+        candidates = []
+        for rank in range(max(len(docs), len(notes))):
+            # the user's own notes win ties
+            if rank < len(notes):
+                candidates.append((notes[rank], "note"))
+            if rank < len(docs):
+                candidates.append((docs[rank], "document"))
+        return candidates
+
+    def _truncate(self, text: str, max_tokens: int) -> str:
+        # longest prefix, cut at a word boundary, that fits
+        words = text.split(" ")
+        low, high = 0, len(words)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(" ".join(words[:middle])) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return " ".join(words[:low])
+
+    def assemble(
+        self, docs: List[str], notes: List[str]
+    ) -> Tuple[List[str], List[str], int, int]:
+        """-> (docs, notes, tokens used, duplicates dropped), each list kept in
+        rank order."""
+        picked = {"document": [], "note": []}
+        seen: Set[Tuple[str, ...]] = set()
+        tokens = duplicates = 0
+
+        for text, kind in self._candidates(docs, notes):
+            shingles = _shingles(text, self.shingle_size)
+            if not shingles:
+                continue
+
+            covered = len(shingles & seen) / len(shingles)
+            if covered >= self.duplicate_threshold:
+                duplicates += 1
+                continue
+
+            remaining = self.token_budget - tokens
+            cost = self.count_tokens(text)
+            if cost > remaining:
+                if tokens:
+                    # a later, shorter candidate may still fit
+                    continue
+                # the best candidate alone is over budget; keep its start
+                text = self._truncate(text, remaining)
+                if not text:
+                    continue
+                cost = self.count_tokens(text)
+
+            picked[kind].append(text)
+            seen |= shingles
+            tokens += cost
+
+        return picked["document"], picked["note"], tokens, duplicates
@@ -0,0 +1,58 @@
+from typing import List
+
+import numpy as np
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from models.db_models import ChunkEmbedding
+from services.chroma_db import IndexedChunk
+
+
+def load_cached_chunks(db: Session, content_hash: str) -> List[IndexedChunk]:
+    rows = (
+        db.query(ChunkEmbedding)
+        .filter(ChunkEmbedding.content_hash == content_hash)
+        .filter(ChunkEmbedding.embedding_model == settings.EMBEDDING_MODEL_NAME)
+        .order_by(ChunkEmbedding.page_num, ChunkEmbedding.chunk_num)
+        .all()
+    )
+
+    return [
+        (
+            row.text,
+            np.frombuffer(row.embedding, dtype=np.float32).tolist(),
+            {"page_num": row.page_num, "chunk_num": row.chunk_num},
+        )
+        for row in rows
+    ]
+
+
+def store_cached_chunks(db: Session, content_hash: str, chunks: List[IndexedChunk]):
+    db.add_all(
+        [
+            ChunkEmbedding(
+                content_hash=content_hash,
+                embedding_model=settings.EMBEDDING_MODEL_NAME,
+                page_num=metadata["page_num"],
+                chunk_num=metadata["chunk_num"],
+                text=chunk,
+                embedding=np.asarray(embedding, dtype=np.float32).tobytes(),
+            )
+            for chunk, embedding, metadata in chunks
+        ]
+    )
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # a concurrent upload of the same file stored them first
+        db.rollback()
+
+
+async def drop_cached_chunks(db: AsyncSession, content_hash: str):
+    await db.execute(
+        delete(ChunkEmbedding).where(ChunkEmbedding.content_hash == content_hash)
+    )
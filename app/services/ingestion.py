@@ -0,0 +1,353 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from db.session import SessionLocal
+from models.db_models import Document, IngestionJob, IngestionStatusEnum, Workspace
+from services.chroma_db import (
+    chroma_drop_workspace,
+    chroma_remove_document,
+    chroma_save_cached_document,
+    chroma_save_document,
+)
+from services.embedding_cache import load_cached_chunks, store_cached_chunks
+
+_RUNNING_STATUSES = (IngestionStatusEnum.parsing, IngestionStatusEnum.embedding)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+async def enqueue_document(db: AsyncSession, doc: Document) -> IngestionJob:
+    # the document and its job commit together, so no document is ever
+    # visible without a job to index it
+    db.add(doc)
+    await db.flush()
+
+    job = IngestionJob(document_id=doc.id, status=IngestionStatusEnum.queued)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    ingestion_pool.notify()
+
+    return job
+
+
+def _requeue_stale_jobs(db: Session):
+    # a job whose worker died (crash, redeploy) stops reporting progress;
+    # hand it back to the queue once it has been silent for long enough,
+    # unless it has used up its attempts
+    cutoff = _now() - timedelta(seconds=settings.INGESTION_STALE_AFTER_SECONDS)
+    max_attempts = settings.INGESTION_MAX_ATTEMPTS
+
+    def stale():
+        return (
+            db.query(IngestionJob)
+            .filter(IngestionJob.status.in_(_RUNNING_STATUSES))
+            .filter(IngestionJob.updated_at < cutoff)
+        )
+
+    failed = (
+        stale()
+        .filter(IngestionJob.attempts >= max_attempts)
+        .update(
+            {
+                IngestionJob.status: IngestionStatusEnum.failed,
+                IngestionJob.error: f"Worker stopped responding {max_attempts} times",
+                IngestionJob.updated_at: _now(),
+                IngestionJob.finished_at: _now(),
+            },
+            synchronize_session=False,
+        )
+    )
+    requeued = stale().update(
+        {
+            IngestionJob.status: IngestionStatusEnum.queued,
+            IngestionJob.updated_at: _now(),
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+
+    if failed:
+        print(f"failed {failed} ingestion job(s) out of attempts")
+    if requeued:
+        print(f"requeued {requeued} stale ingestion job(s)")
+
+
+def _claim_next_job() -> Optional[int]:
+    db = SessionLocal()
+    try:
+        _requeue_stale_jobs(db)
+
+        # SKIP LOCKED lets several app processes drain the same queue
+        job = (
+            db.query(IngestionJob)
+            .filter(IngestionJob.status == IngestionStatusEnum.queued)
+            .order_by(IngestionJob.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if not job:
+            db.commit()
+            return None
+
+        job.status = IngestionStatusEnum.parsing
+        job.attempts = (job.attempts or 0) + 1
+        job.pages_done = 0
+        job.error = None
+        job.updated_at = _now()
+        db.commit()
+
+        return job.id
+    finally:
+        db.close()
+
+
+def _drop_orphaned_vectors(db: Session, doc_id: int, workspace_id: int):
+    # the document or its workspace may have been deleted while the job was
+    # writing; their vectors were dropped then, so drop what this job re-created
+    db.rollback()
+
+    if not db.get(Workspace, workspace_id):
+        chroma_drop_workspace(workspace_id)
+    elif not (
+        db.query(Document.id)
+        .filter(Document.id == doc_id, Document.workspace_id == workspace_id)
+        .first()
+    ):
+        chroma_remove_document(doc_id, workspace_id)
+
+
+class _JobLost(Exception):
+    """The job was handed to another worker while this one still ran it."""
+
+
+def _owned_job(db: Session, job_id: int, attempt: int):
+    # every claim bumps attempts, so a requeued and reclaimed job no longer
+    # matches the attempt its first worker holds
+    return db.query(IngestionJob).filter(
+        IngestionJob.id == job_id,
+        IngestionJob.attempts == attempt,
+        IngestionJob.status.in_(_RUNNING_STATUSES),
+    )
+
+
+def _update_owned_job(db: Session, job_id: int, attempt: int, values: dict):
+    updated = _owned_job(db, job_id, attempt).update(
+        {IngestionJob.updated_at: _now(), **values}, synchronize_session=False
+    )
+    db.commit()
+
+    if not updated:
+        raise _JobLost()
+
+
+class _Heartbeat:
+    """Bumps a claimed job's ``updated_at`` while its worker is busy with it.
+
+    Progress is only reported per embedding batch, so a slow parse would
+    otherwise look like a dead worker and get requeued.
+    """
+
+    def __init__(self, job_id: int, attempt: int, interval: float):
+        self.job_id = job_id
+        self.attempt = attempt
+        self.interval = interval
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"ingestion-heartbeat-{job_id}", daemon=True
+        )
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            db = SessionLocal()
+            try:
+                _update_owned_job(db, self.job_id, self.attempt, {})
+            except _JobLost:
+                return
+            except Exception as e:
+                print(f"ingestion job {self.job_id} heartbeat failed: {e}")
+            finally:
+                db.close()
+
+
+async def _process_job(job_id: int):
+    db = SessionLocal()
+    target = None
+    attempt = None
+    try:
+        job = db.get(IngestionJob, job_id)
+        attempt = job.attempts
+        doc = job.document
+
+        # a deleted workspace leaves its documents detached
+        if not doc or doc.workspace_id is None:
+            _update_owned_job(
+                db,
+                job_id,
+                attempt,
+                {
+                    IngestionJob.status: IngestionStatusEnum.failed,
+                    IngestionJob.error: "Document no longer exists",
+                    IngestionJob.finished_at: _now(),
+                },
+            )
+            return
+
+        target = (doc.id, doc.workspace_id)
+
+        if job.attempts > 1:
+            # drop vectors left behind by the interrupted attempt
+            chroma_remove_document(doc.id, doc.workspace_id)
+
+        def on_progress(stage: str, pages_done: int, pages_total: Optional[int]):
+            # stops this worker if the job has been handed to another one
+            _update_owned_job(
+                db,
+                job_id,
+                attempt,
+                {
+                    IngestionJob.status: IngestionStatusEnum(stage),
+                    IngestionJob.pages_done: pages_done,
+                    IngestionJob.pages_total: pages_total,
+                },
+            )
+
+        with _Heartbeat(job_id, attempt, settings.INGESTION_HEARTBEAT_SECONDS):
+            cached = (
+                load_cached_chunks(db, doc.content_hash) if doc.content_hash else []
+            )
+
+            if cached:
+                # same file was ingested before, reuse its vectors without the model
+                chroma_save_cached_document(doc, cached)
+            else:
+                chunks = await chroma_save_document(doc, on_progress=on_progress)
+                if doc.content_hash:
+                    store_cached_chunks(db, doc.content_hash, chunks)
+
+        _update_owned_job(
+            db,
+            job_id,
+            attempt,
+            {
+                IngestionJob.status: IngestionStatusEnum.indexed,
+                IngestionJob.finished_at: _now(),
+            },
+        )
+
+    except _JobLost:
+        db.rollback()
+        print(f"ingestion job {job_id} was taken over by another worker")
+
+    except Exception as e:
+        db.rollback()
+        print(f"ingestion job {job_id} failed: {e}")
+
+        if attempt is None:
+            return
+
+        try:
+            _update_owned_job(
+                db,
+                job_id,
+                attempt,
+                {
+                    IngestionJob.status: IngestionStatusEnum.failed,
+                    IngestionJob.error: str(e),
+                    IngestionJob.finished_at: _now(),
+                },
+            )
+        except _JobLost:
+            pass
+    finally:
+        try:
+            if target:
+                _drop_orphaned_vectors(db, *target)
+        except Exception as e:
+            print(f"ingestion job {job_id} could not check for orphans: {e}")
+        db.close()
+
+
+class IngestionWorkerPool:
+    """Fixed number of worker threads draining the ``ingestion_jobs`` table.
+
+    The pool size caps how many documents are parsed and embedded at once,
+    independently of how many uploads arrive.
+    """
+
+    def __init__(self, workers: int, poll_interval: float):
+        self.workers = workers
+        self.poll_interval = poll_interval
+
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def start(self):
+        if self._threads:
+            return
+
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"ingestion-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        self._wakeup.set()
+
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        self._wakeup.set()
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+        try:
+            while not self._stop.is_set():
+                self._wakeup.clear()
+
+                try:
+                    job_id = _claim_next_job()
+                except Exception as e:
+                    print(f"ingestion worker could not claim a job: {e}")
+                    job_id = None
+
+                if job_id is None:
+                    self._wakeup.wait(self.poll_interval)
+                    continue
+
+                loop.run_until_complete(_process_job(job_id))
+        finally:
+            loop.close()
+
+
+ingestion_pool = IngestionWorkerPool(
+    workers=settings.INGESTION_WORKERS,
+    poll_interval=settings.INGESTION_POLL_INTERVAL_SECONDS,
+)
@@ -1,11 +1,13 @@
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
-from models import db_models
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains.conversation.base import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, SystemMessage
+
+from core.config import settings
+from services.chroma_db import count_tokens
+from services.llm_providers import create_chat_model
 
 
 load_dotenv()
@@ -104,58 +106,175 @@ _feynman_level_prompts = {
 }
 
 
-def build_memory_from_db(
-    messages: List[dict], mode: str, feynman_level: Optional[str] = None
-) -> ConversationBufferMemory:
-    memory = ConversationBufferMemory(return_messages=True)
-
-    memory.chat_memory.add_messages(
-        [
-            SystemMessage(
-                (
-                    "You are an AI tutor embedded within a learning application. "
-                    "Your role is to help users deeply understand lessons and subjects based on their shared documents, notes, and PDFs. "
-                    "Your behavior will change depending on the current mode, which will be explicitly provided. Each mode has a distinct educational purpose and interaction style. "
-                    "There are seven modes in total:\n"
-                    "Chat: Engage in a casual, helpful dialogue. Answer questions, clarify concepts, and support open-ended learning.\n"
-                    "Role-play: Take on a relevant character or persona (e.g., a historical figure, expert, or examiner) to simulate realistic learning scenarios.\n"
-                    "Feynman: In this mode, the user takes the role of teacher. You will act as a learner at one of three levels—child, student, or professor—and respond accordingly. Your purpose is to help the user uncover gaps in their understanding by asking questions and reacting authentically.\n"
-                    "Debate: Take a stance and encourage the user to argue the opposite side. Promote critical thinking, reasoning, and respectful disagreement.\n"
-                    "Case-study: Present or explore realistic, practical examples. Guide the user through applying theory to situational problems.\n"
-                    "Reflect: Ask thoughtful, open-ended questions to prompt the user’s self-reflection. Help them articulate what they’ve learned, what surprised them, and what questions still remain.\n"
-                    "Editor: Act as a critical reviewer of the user’s written content. Give feedback on clarity, accuracy, structure, and style, while helping refine ideas.\n"
-                    "Always base your responses on the user's provided materials, and tailor your output to the current mode to enhance the learning experience. "
-                    "More detailed information about mode will be given when it is specified."
-                    "Respond to user based on the language user is using."
-                    "Respond in plain text only. Avoid any markdown formatting like backticks, stars, headers, or code blocks."
-                )
-            ),
-            SystemMessage(_mode_prompts[mode]),
-        ]
+_base_system_message = SystemMessage(
+    (
+        "You are an AI tutor embedded within a learning application. "
+        "Your role is to help users deeply understand lessons and subjects based on their shared documents, notes, and PDFs. "
+        "Your behavior will change depending on the current mode, which will be explicitly provided. Each mode has a distinct educational purpose and interaction style. "
+        "There are seven modes in total:\n"
+        "Chat: Engage in a casual, helpful dialogue. Answer questions, clarify concepts, and support open-ended learning.\n"
+        "Role-play: Take on a relevant character or persona (e.g., a historical figure, expert, or examiner) to simulate realistic learning scenarios.\n"
+        "Feynman: In this mode, the user takes the role of teacher. You will act as a learner at one of three levels—child, student, or professor—and respond accordingly. Your purpose is to help the user uncover gaps in their understanding by asking questions and reacting authentically.\n"
+        "Debate: Take a stance and encourage the user to argue the opposite side. Promote critical thinking, reasoning, and respectful disagreement.\n"
+        "Case-study: Present or explore realistic, practical examples. Guide the user through applying theory to situational problems.\n"
+        "Reflect: Ask thoughtful, open-ended questions to prompt the user’s self-reflection. Help them articulate what they’ve learned, what surprised them, and what questions still remain.\n"
+        "Editor: Act as a critical reviewer of the user’s written content. Give feedback on clarity, accuracy, structure, and style, while helping refine ideas.\n"
+        "Always base your responses on the user's provided materials, and tailor your output to the current mode to enhance the learning experience. "
+        "More detailed information about mode will be given when it is specified."
+        "Respond to user based on the language user is using."
+        "Respond in plain text only. Avoid any markdown formatting like backticks, stars, headers, or code blocks."
+    )
+)
+
+
+# immutable system-message prefixes, built once per (mode, feynman level)
+_system_prefixes: Dict[Tuple[str, Optional[str]], Tuple[SystemMessage, ...]] = {
+    (mode, level): (
+        (_base_system_message, SystemMessage(mode_prompt))
+        + ((SystemMessage(_feynman_level_prompts[level]),) if level else ())
     )
+    for mode, mode_prompt in _mode_prompts.items()
+    for level in (None, *_feynman_level_prompts)
+}
+
+
+_summary_prompt = (
+    "You maintain a running summary of a tutoring conversation between a user and an AI tutor. "
+    "You are given the current summary and the next lines of the conversation. "
+    "Return an updated summary that keeps the topics covered, the user's questions, "
+    "explanations given, misconceptions noticed and anything the user asked to remember. "
+    "Write it in the language of the conversation, in plain text, in at most 300 words."
+)
+
+
+class RollingSummaryMemory:
+    """Chat memory whose prompt size stays bounded as a conversation grows.
+
+    The latest ``recent_turns`` turns are kept verbatim as long as they fit in
+    ``token_budget``. Older messages are folded into a running summary by
+    ``acompact``, at most ``compact_batch`` at a time, so the summary is
+    extended rather than recomputed. Messages waiting to be folded are left
+    out of the prompt, so it stays bounded while compaction catches up.
+    """
+
+    def __init__(
+        self,
+        prefix: Tuple[BaseMessage, ...],
+        summary: Optional[str],
+        summarized_through_seq: int,
+        token_budget: int,
+        recent_turns: int,
+        compact_batch: int,
+    ):
+        self.prefix = prefix
+        self.summary = summary
+        self.summarized_through_seq = summarized_through_seq
+        self.token_budget = token_budget
+        self.recent_turns = recent_turns
+        self.compact_batch = compact_batch
+
+        # (seq, message, token count)
+        self.recent: List[Tuple[int, BaseMessage, int]] = []
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        messages = list(self.prefix)
+        if self.summary:
+            messages.append(
+                SystemMessage(f"Summary of the earlier conversation:\n{self.summary}")
+            )
+        pending = self._overflow()
+        messages.extend(message for _, message, _ in self.recent[pending:])
+        return messages
+
+    def add_message(self, seq: int, message: BaseMessage):
+        self.recent.append((seq, message, count_tokens(message.content)))
+
+    def _overflow(self) -> int:
+        # number of leading recent messages that no longer fit
+        overflow = max(0, len(self.recent) - 2 * self.recent_turns)
 
-    if feynman_level:
-        memory.chat_memory.add_message(
-            SystemMessage(_feynman_level_prompts[feynman_level])
+        tokens = sum(t for _, _, t in self.recent[overflow:])
+        if self.summary:
+            tokens += count_tokens(self.summary)
+
+        # always keep the last turn verbatim, even if it alone is over budget
+        while tokens > self.token_budget and len(self.recent) - overflow > 2:
+            tokens -= self.recent[overflow][2]
+            overflow += 1
+
+        return overflow
+
+    async def acompact(self, llm: BaseChatModel) -> bool:
+        # messages added while the call is in flight land after the fold
+        overflow = min(self._overflow(), self.compact_batch)
+        if not overflow:
+            return False
+
+        folded = self.recent[:overflow]
+        transcript = "\n".join(
+            f"{'User' if isinstance(message, HumanMessage) else 'Tutor'}: {message.content}"
+            for _, message, _ in folded
         )
 
+        response = await llm.ainvoke(
+            [
+                SystemMessage(_summary_prompt),
+                HumanMessage(
+                    f"Current summary:\n{self.summary or '(empty)'}\n\n"
+                    f"Next lines:\n{transcript}"
+                ),
+            ]
+        )
+
+        self.summary = response.content.strip()
+        self.summarized_through_seq = folded[-1][0]
+        self.recent = self.recent[overflow:]
+
+        return True
+
+
+def build_memory_from_db(
+    messages: List[dict],
+    mode: str,
+    feynman_level: Optional[str] = None,
+    summary: Optional[str] = None,
+    summarized_through_seq: int = 0,
+) -> RollingSummaryMemory:
+    memory = RollingSummaryMemory(
+        _system_prefixes[(mode, feynman_level or None)],
+        summary,
+        summarized_through_seq,
+        token_budget=settings.MEMORY_TOKEN_BUDGET,
+        recent_turns=settings.MEMORY_RECENT_TURNS,
+        compact_batch=settings.MEMORY_COMPACT_BATCH,
+    )
+
+    # messages: rows after summarized_through_seq, as {"seq", "sender", "text"}
     for msg in messages:
         if msg["sender"] == "user":
-            memory.chat_memory.add_message(HumanMessage(content=msg["text"]))
+            memory.add_message(msg["seq"], HumanMessage(content=msg["text"]))
         elif msg["sender"] == "ai":
-            memory.chat_memory.add_message(AIMessage(content=msg["text"]))
+            memory.add_message(msg["seq"], AIMessage(content=msg["text"]))
     return memory
 
 
+@lru_cache(maxsize=None)
+def get_llm() -> BaseChatModel:
+    # one client per process, so its HTTP connection pool is reused by every
+    # chat session instead of being set up per websocket
+    return create_chat_model()
+
+
 def initialize_chain(
-    db_chat: db_models.ChatHistory, mode: str, feynman_level: Optional[str] = None
+    messages: List[dict],
+    mode: str,
+    feynman_level: Optional[str] = None,
+    summary: Optional[str] = None,
+    summarized_through_seq: int = 0,
 ):
-    memory = build_memory_from_db(db_chat.messages or [], mode, feynman_level)
-
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0.7,
-        streaming=True,
+    memory = build_memory_from_db(
+        messages, mode, feynman_level, summary, summarized_through_seq
     )
 
-    return ConversationChain(llm=llm, memory=memory, verbose=True), memory
+    return get_llm(), memory
@@ -0,0 +1,241 @@
+import bisect
+import math
+import os
+import re
+import struct
+import unicodedata
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+# (page_num, chunk_num), the same pair that names a chunk in Chroma
+ChunkKey = Tuple[int, int]
+
+# Sidecar layout, next to the blob as "<blob>.terms":
+#   magic, chunk count, term count, length of the model name, the name, then
+#   one zlib block holding chunk keys, chunk lengths, the postings offsets per
+#   term, the postings themselves (chunk index, term frequency) and the terms.
+# Chunk keys depend on the splitter, so an index built for another embedding
+# model is ignored.
+_MAGIC = b"NXLX"
+_HEADER = struct.Struct("<4sIII")
+
+_COMPRESSION_LEVEL = 6
+
+# BM25 parameters, the usual defaults
+_K1 = 1.2
+_B = 0.75
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    # accents and case are folded so "Çözüm", "çözüm" and "cozum" match
+    folded = "".join(
+        c
+        for c in unicodedata.normalize("NFKD", text)
+        if unicodedata.category(c) != "Mn"
+    ).casefold()
+    return [token for token in _TOKEN_RE.findall(folded) if len(token) > 1]
+
+
+def lexical_index_path(file_path: str) -> str:
+    return f"{file_path}.terms"
+
+
+class LexicalIndex:
+    """BM25 over one document's chunks."""
+
+    def __init__(
+        self,
+        model: str,
+        keys: np.ndarray,
+        lengths: np.ndarray,
+        terms: List[str],
+        offsets: np.ndarray,
+        postings_chunk: np.ndarray,
+        postings_tf: np.ndarray,
+    ):
+        self.model = model
+        self.keys = keys
+        self.lengths = lengths
+        # sorted, looked up by bisection
+        self.terms = terms
+        self.offsets = offsets
+        self.postings_chunk = postings_chunk
+        self.postings_tf = postings_tf
+
+        self._avg_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    @classmethod
+    def build(cls, model: str, chunks: Iterable[Tuple[ChunkKey, str]]):
+        keys, lengths = [], []
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for index, (key, text) in enumerate(chunks):
+            counts = Counter(tokenize(text))
+            keys.append(key)
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((index, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.uint32)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(postings[term])
+
+        flat = [posting for term in terms for posting in postings[term]]
+        return cls(
+            model,
+            np.array(keys, dtype=np.uint32).reshape(-1, 2),
+            np.array(lengths, dtype=np.uint32),
+            terms,
+            offsets,
+            np.array([chunk for chunk, _ in flat], dtype=np.uint32),
+            np.array([min(tf, 0xFFFF) for _, tf in flat], dtype=np.uint16),
+        )
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        i = bisect.bisect_left(self.terms, term)
+        if i == len(self.terms) or self.terms[i] != term:
+            return None
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.postings_chunk[start:end], self.postings_tf[start:end]
+
+    def scores(self, query: str) -> np.ndarray:
+        n = len(self.keys)
+        scores = np.zeros(n, dtype=np.float32)
+        if n == 0:
+            return scores
+
+        norms = _K1 * (1 - _B + _B * self.lengths / self._avg_length)
+        for term in set(tokenize(query)):
+            postings = self._postings(term)
+            if postings is None:
+                continue
+
+            chunks, tf = postings
+            idf = math.log(1 + (n - len(chunks) + 0.5) / (len(chunks) + 0.5))
+            tf = tf.astype(np.float32)
+            scores[chunks] += idf * tf * (_K1 + 1) / (tf + norms[chunks])
+
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[ChunkKey]:
+        """Keys of the best ``k`` chunks with at least one query term."""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores)
+        if len(matched) == 0:
+            return []
+
+        k = min(k, len(matched))
+        candidates = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+        return [(int(page), int(chunk)) for page, chunk in self.keys[ranked]]
+
+    def to_bytes(self) -> bytes:
+        model = self.model.encode("utf-8")
+        body = b"".join(
+            (
+                self.keys.astype("<u4").tobytes(),
+                self.lengths.astype("<u4").tobytes(),
+                self.offsets.astype("<u4").tobytes(),
+                self.postings_chunk.astype("<u4").tobytes(),
+                self.postings_tf.astype("<u2").tobytes(),
+                "\n".join(self.terms).encode("utf-8"),
+            )
+        )
+        return (
+            _HEADER.pack(_MAGIC, len(self.keys), len(self.terms), len(model))
+            + model
+            + zlib.compress(body, _COMPRESSION_LEVEL)
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LexicalIndex":
+        magic, n_chunks, n_terms, model_length = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC:
+            raise ValueError("not a lexical index")
+
+        start = _HEADER.size
+        model = data[start : start + model_length].decode("utf-8")
+        body = zlib.decompress(data[start + model_length :])
+
+        position = 0
+
+        def take(dtype: str, count: int) -> np.ndarray:
+            nonlocal position
+            array = np.frombuffer(body, dtype=dtype, count=count, offset=position)
+            position += array.nbytes
+            return array
+
+        keys = take("<u4", n_chunks * 2).reshape(-1, 2)
+        lengths = take("<u4", n_chunks)
+        offsets = take("<u4", n_terms + 1)
+        postings_chunk = take("<u4", int(offsets[-1]))
+        postings_tf = take("<u2", int(offsets[-1]))
+        terms = body[position:].decode("utf-8").split("\n") if n_terms else []
+        if len(terms) != n_terms:
+            raise ValueError("lexical index is truncated")
+
+        return cls(model, keys, lengths, terms, offsets, postings_chunk, postings_tf)
+
+
+def write_lexical_index(
+    file_path: str, model: str, chunks: Iterable[Tuple[ChunkKey, str]]
+):
+    data = LexicalIndex.build(model, chunks).to_bytes()
+
+    path = lexical_index_path(file_path)
+    tmp_path = f"{path}.{uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def remove_lexical_index(file_path: str):
+    path = lexical_index_path(file_path)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def load_lexical_index(file_path: str, model: str) -> Optional[LexicalIndex]:
+    """The index for ``file_path``, or None when it is missing, unreadable or
+    was built for another model."""
+    path = lexical_index_path(file_path)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "rb") as f:
+            index = LexicalIndex.from_bytes(f.read())
+    except (OSError, ValueError, struct.error, zlib.error) as e:
+        print(f"ignoring lexical index {path}: {e}")
+        return None
+
+    if index.model != model:
+        return None
+    return index
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence], k: int) -> List:
+    """Merges best-first rankings by summing 1 / (k + rank) per item."""
+    fused: Dict = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + 1.0 / (k + rank)
+
+    # ties keep first-seen order, which favours the earlier rankings
+    return sorted(fused, key=fused.get, reverse=True)
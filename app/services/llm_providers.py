@@ -0,0 +1,257 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import PrivateAttr
+
+from core.config import settings
+
+
+def prompt_key(messages: List[BaseMessage]) -> str:
+    payload = json.dumps([[m.type, m.content] for m in messages], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def _collect(stream: AsyncIterator[ChatGenerationChunk]) -> ChatResult:
+    text = "".join([chunk.message.content async for chunk in stream])
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Local stand-in that streams a canned reply with a set latency profile.
+
+    The first token arrives after ``ttft_ms``; the rest follow at
+    ``tokens_per_second``. Nothing leaves the process.
+    """
+
+    ttft_ms: float = 300.0
+    tokens_per_second: float = 60.0
+    response_tokens: int = 200
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _tokens(self) -> List[str]:
+        return [f"token{i} " for i in range(self.response_tokens)]
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        tokens = self._tokens()
+        time.sleep(self.ttft_ms / 1000 + len(tokens) / self.tokens_per_second)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))]
+        )
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.ttft_ms / 1000)
+
+        for i, token in enumerate(self._tokens()):
+            if i:
+                await asyncio.sleep(1 / self.tokens_per_second)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await _collect(self._astream(messages, stop, **kwargs))
+
+
+class RecordingChatModel(BaseChatModel):
+    """Passes calls through to ``inner`` and appends each streamed reply,
+    with per-chunk timing, to a JSONL file that ReplayChatModel can play back.
+    """
+
+    inner: BaseChatModel
+    path: str
+
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return f"recording-{self.inner._llm_type}"
+
+    def _record(self, messages: List[BaseMessage], chunks: List[list]):
+        record = {"key": prompt_key(messages), "chunks": chunks}
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        start = time.perf_counter()
+        message = self.inner.invoke(messages, stop=stop, **kwargs)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        self._record(messages, [[elapsed_ms, message.content]])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        start = time.perf_counter()
+        chunks = []
+
+        async for chunk in self.inner.astream(messages, stop=stop, **kwargs):
+            chunks.append([(time.perf_counter() - start) * 1000, chunk.content])
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk.content))
+
+        self._record(messages, chunks)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await _collect(self._astream(messages, stop, **kwargs))
+
+
+class ReplayChatModel(BaseChatModel):
+    """Replays replies captured by RecordingChatModel with their original timing.
+
+    A prompt that was recorded gets its own reply back; any other prompt gets
+    the recordings in file order, round-robin, so a load test does not need
+    to reproduce the captured prompts exactly. ``speed`` scales the timing.
+    """
+
+    path: str
+    speed: float = 1.0
+
+    _by_key: dict = PrivateAttr(default_factory=dict)
+    _records: list = PrivateAttr(default_factory=list)
+    _next: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context: Any):
+        super().model_post_init(__context)
+
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._records.append(record["chunks"])
+                    self._by_key.setdefault(record["key"], record["chunks"])
+
+        if not self._records:
+            raise ValueError(f"No recorded LLM sessions in {self.path}")
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _chunks_for(self, messages: List[BaseMessage]) -> List[list]:
+        chunks = self._by_key.get(prompt_key(messages))
+        if chunks is None:
+            chunks = self._records[self._next % len(self._records)]
+            self._next += 1
+        return chunks
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        chunks = self._chunks_for(messages)
+        time.sleep(chunks[-1][0] / 1000 / self.speed if chunks else 0)
+
+        text = "".join(content for _, content in chunks)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        elapsed_ms = 0.0
+
+        for offset_ms, content in self._chunks_for(messages):
+            await asyncio.sleep(max(0.0, offset_ms - elapsed_ms) / 1000 / self.speed)
+            elapsed_ms = offset_ms
+            yield ChatGenerationChunk(message=AIMessageChunk(content=content))
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await _collect(self._astream(messages, stop, **kwargs))
+
+
+def _gemini_chat_model() -> BaseChatModel:
+    # imported here so the fake and replay providers run without the Gemini SDK
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(
+        model=settings.LLM_MODEL,
+        temperature=settings.LLM_TEMPERATURE,
+        streaming=True,
+        verbose=settings.LLM_VERBOSE,
+    )
+
+
+def create_chat_model() -> BaseChatModel:
+    provider = settings.LLM_PROVIDER
+
+    if provider == "gemini":
+        return _gemini_chat_model()
+
+    if provider == "fake":
+        return FakeStreamingChatModel(
+            ttft_ms=settings.FAKE_LLM_TTFT_MS,
+            tokens_per_second=settings.FAKE_LLM_TOKENS_PER_SECOND,
+            response_tokens=settings.FAKE_LLM_RESPONSE_TOKENS,
+        )
+
+    if provider == "record":
+        os.makedirs(os.path.dirname(settings.LLM_RECORDING_PATH) or ".", exist_ok=True)
+        return RecordingChatModel(
+            inner=_gemini_chat_model(), path=settings.LLM_RECORDING_PATH
+        )
+
+    if provider == "replay":
+        return ReplayChatModel(
+            path=settings.LLM_RECORDING_PATH, speed=settings.LLM_REPLAY_SPEED
+        )
+
+    raise ValueError(f"Unknown LLM_PROVIDER: {provider}")
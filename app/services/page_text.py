@@ -0,0 +1,112 @@
+import mmap
+import os
+import struct
+import zlib
+from typing import Iterator, List, Optional
+from uuid import uuid4
+
+# Sidecar layout, next to the blob as "<blob>.pages":
+#   magic, page count, then per page (offset, length) of its zlib block,
+#   then the blocks. Pages compress separately so any one can be read alone.
+_MAGIC = b"NXPT"
+_HEADER = struct.Struct("<4sI")
+_ENTRY = struct.Struct("<QI")
+
+_COMPRESSION_LEVEL = 6
+
+
+def page_text_path(file_path: str) -> str:
+    return f"{file_path}.pages"
+
+
+def write_page_text(file_path: str, pages: List[str]):
+    blocks = [zlib.compress(text.encode("utf-8"), _COMPRESSION_LEVEL) for text in pages]
+
+    offset = _HEADER.size + _ENTRY.size * len(blocks)
+    index = []
+    for block in blocks:
+        index.append(_ENTRY.pack(offset, len(block)))
+        offset += len(block)
+
+    path = page_text_path(file_path)
+    tmp_path = f"{path}.{uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as out:
+            out.write(_HEADER.pack(_MAGIC, len(blocks)))
+            out.writelines(index)
+            out.writelines(blocks)
+        # readers only ever see a complete file
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def remove_page_text(file_path: str):
+    path = page_text_path(file_path)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class PageTextReader:
+    """Memory-mapped view of a page text sidecar."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, self._count = _HEADER.unpack_from(self._map, 0)
+            if magic != _MAGIC:
+                raise ValueError(f"{path} is not a page text file")
+
+            end = _HEADER.size + _ENTRY.size * self._count
+            last_offset, last_length = (
+                _ENTRY.unpack_from(self._map, end - _ENTRY.size)
+                if self._count
+                else (end, 0)
+            )
+            if last_offset + last_length != len(self._map):
+                raise ValueError(f"{path} is truncated")
+        except Exception:
+            self._map.close()
+            raise
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def page(self, index: int) -> str:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+
+        offset, length = _ENTRY.unpack_from(
+            self._map, _HEADER.size + _ENTRY.size * index
+        )
+        return zlib.decompress(self._map[offset : offset + length]).decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(self._count):
+            yield self.page(i)
+
+    def close(self):
+        self._map.close()
+
+
+def open_page_text(file_path: str) -> Optional[PageTextReader]:
+    """The sidecar for ``file_path``, or None when it is missing or unreadable."""
+    path = page_text_path(file_path)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        return PageTextReader(path)
+    except (OSError, ValueError, struct.error) as e:
+        print(f"ignoring page text sidecar {path}: {e}")
+        return None
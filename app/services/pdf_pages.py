@@ -0,0 +1,71 @@
+# Kept free of heavy imports: every process-pool worker imports this module.
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+from core.config import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    reader = PdfReader(file_path)
+    # same call PyPDFLoader makes per page, so chunks come out identical
+    return [
+        (i, reader.pages[i].extract_text(extraction_mode="plain"))
+        for i in range(start, stop)
+    ]
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+
+    if _pool is None:
+        # spawn, not fork: the parent runs worker threads and torch
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.PDF_PARSE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pdf_pool():
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def use_parallel_parsing(pages_total: int) -> bool:
+    return (
+        settings.PDF_PARSE_WORKERS > 1
+        and pages_total >= settings.PDF_PARALLEL_MIN_PAGES
+    )
+
+
+async def iter_pdf_pages_parallel(
+    file_path: str, pages_total: int
+) -> AsyncIterator[Tuple[int, str]]:
+    """Yields ``(page_index, text)`` in page order, extracting ranges in parallel."""
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+    step = max(1, settings.PDF_PARSE_PAGES_PER_TASK)
+
+    futures = [
+        loop.run_in_executor(
+            pool, _extract_page_range, file_path, start, min(start + step, pages_total)
+        )
+        for start in range(0, pages_total, step)
+    ]
+
+    try:
+        for future in futures:
+            for page in await future:
+                yield page
+    finally:
+        for future in futures:
+            future.cancel()
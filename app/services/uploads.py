@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+from uuid import uuid4
+
+import anyio
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from models.db_models import Document, UploadSession, User, Workspace
+from models.schemas import UploadInit
+from services.blob_store import new_tmp_path, remove_tmp
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _expired_before() -> datetime:
+    return _now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL_SECONDS)
+
+
+async def _drop_expired_sessions(db: AsyncSession, user_id: int):
+    expired = (
+        await db.scalars(
+            select(UploadSession)
+            .filter(UploadSession.user_id == user_id)
+            .filter(UploadSession.updated_at < _expired_before())
+        )
+    ).all()
+
+    for session in expired:
+        await anyio.to_thread.run_sync(remove_tmp, session.tmp_path)
+        await db.delete(session)
+
+    if expired:
+        await db.commit()
+
+
+async def _lock_user_quota(db: AsyncSession, user_id: int):
+    # concurrent reservations by one user queue here until the transaction
+    # ends, so each one sees the sessions the others inserted
+    await db.execute(select(User.id).filter(User.id == user_id).with_for_update())
+
+
+async def _storage_used(db: AsyncSession, user_id: int) -> int:
+    # bytes of the user's documents plus the full size of open uploads
+    documents = await db.scalar(
+        select(func.coalesce(func.sum(Document.file_size), 0))
+        .join(Workspace, Document.workspace_id == Workspace.id)
+        .filter(Workspace.user_id == user_id)
+    )
+    reserved = await db.scalar(
+        select(func.coalesce(func.sum(UploadSession.size), 0)).filter(
+            UploadSession.user_id == user_id
+        )
+    )
+    return documents + reserved
+
+
+async def _rejection(db: AsyncSession, user_id: int, size: int) -> Optional[str]:
+    if size > settings.UPLOAD_MAX_BYTES:
+        return f"File exceeds the {settings.UPLOAD_MAX_BYTES} byte limit"
+
+    if await _storage_used(db, user_id) + size > settings.UPLOAD_USER_QUOTA_BYTES:
+        return "Upload quota exceeded"
+
+    return None
+
+
+async def upload_rejection(db: AsyncSession, user_id: int, size: int) -> Optional[str]:
+    # -> reason the upload is refused, or None
+    await _drop_expired_sessions(db, user_id)
+    return await _rejection(db, user_id, size)
+
+
+async def create_upload_session(
+    db: AsyncSession, user_id: int, workspace_id: int, upload: UploadInit
+) -> Tuple[Optional[UploadSession], Optional[str]]:
+    """-> (session, None), or (None, reason) when the upload is refused.
+
+    The quota check and the insert that reserves the space run in one
+    transaction, under a lock on the user's row.
+    """
+    await _drop_expired_sessions(db, user_id)
+    await _lock_user_quota(db, user_id)
+
+    rejection = await _rejection(db, user_id, upload.size)
+    if rejection:
+        await db.rollback()
+        return None, rejection
+
+    tmp_path = new_tmp_path()
+    # created empty so chunks can be written at any offset
+    async with await anyio.open_file(tmp_path, "wb"):
+        pass
+
+    session = UploadSession(
+        id=str(uuid4()),
+        user_id=user_id,
+        workspace_id=workspace_id,
+        filename=upload.filename,
+        size=upload.size,
+        sha256=upload.sha256.lower(),
+        received=0,
+        tmp_path=tmp_path,
+    )
+    db.add(session)
+    await db.commit()
+
+    return session, None
+
+
+async def get_upload_session(
+    db: AsyncSession, upload_id: str, user_id: int
+) -> Optional[UploadSession]:
+    session = await db.get(UploadSession, upload_id)
+    if not session or session.user_id != user_id:
+        return None
+
+    updated_at = session.updated_at
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+
+    if updated_at < _expired_before():
+        await discard_upload_session(db, session)
+        return None
+
+    return session
+
+
+async def advance_upload(
+    db: AsyncSession, session: UploadSession, offset: int, written: int
+) -> bool:
+    # the offset check makes a racing duplicate of the same chunk a no-op
+    result = await db.execute(
+        update(UploadSession)
+        .where(UploadSession.id == session.id)
+        .where(UploadSession.received == offset)
+        .values(received=offset + written, updated_at=_now())
+    )
+    await db.commit()
+
+    if result.rowcount:
+        session.received = offset + written
+    return bool(result.rowcount)
+
+
+async def claim_completed_upload(db: AsyncSession, session: UploadSession) -> bool:
+    """Deletes a fully received session; True for the one caller that did.
+
+    The caller then owns ``tmp_path``, so a second, concurrent complete of the
+    same upload never finds its temp file gone.
+    """
+    result = await db.execute(
+        delete(UploadSession)
+        .where(UploadSession.id == session.id)
+        .where(UploadSession.received == UploadSession.size)
+    )
+    await db.commit()
+    return bool(result.rowcount)
+
+
+async def discard_upload_session(db: AsyncSession, session: UploadSession):
+    await anyio.to_thread.run_sync(remove_tmp, session.tmp_path)
+    await db.delete(session)
+    await db.commit()
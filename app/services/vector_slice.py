@@ -0,0 +1,136 @@
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from core.config import settings
+from services.chroma_db import (
+    document_version,
+    embedding_provider,
+    workspace_collection,
+)
+from services.lexical_index import (
+    ChunkKey,
+    LexicalIndex,
+    load_lexical_index,
+    reciprocal_rank_fusion,
+)
+
+
+class _Matrix:
+    def __init__(self, results: dict):
+        self.texts: List[str] = results["documents"] or []
+
+        embeddings = results["embeddings"]
+        if len(self.texts) == 0:
+            self.vectors = np.empty((0, 0), dtype=np.float32)
+        else:
+            self.vectors = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+        # ||x||^2 per row; with it, ranking by ||x - q||^2 needs only x . q
+        self.sq_norms = np.einsum("ij,ij->i", self.vectors, self.vectors)
+
+    def ranked(self, query: np.ndarray, k: int) -> np.ndarray:
+        # -> row indices of the k nearest vectors, nearest first
+        n = len(self.texts)
+        if n == 0:
+            return np.empty(0, dtype=np.intp)
+
+        # same order as Chroma's default l2 space: ||x||^2 - 2 x.q (+ ||q||^2)
+        distances = self.sq_norms - 2.0 * (self.vectors @ query)
+
+        k = min(k, n)
+        if k < n:
+            candidates = np.argpartition(distances, k - 1)[:k]
+        else:
+            candidates = np.arange(n)
+        return candidates[np.argsort(distances[candidates])]
+
+    def top_k(self, query: np.ndarray, k: int) -> List[str]:
+        return [self.texts[i] for i in self.ranked(query, k)]
+
+
+class DocumentVectorSlice:
+    """One document's chunk and note vectors, held in memory for a chat session.
+
+    Loaded from Chroma once, then every turn is a matrix-vector product. It is
+    reloaded when chroma_db reports a change to the document or its notes.
+
+    Document chunks are also ranked by BM25 over the lexical index next to
+    the blob, when there is one, and the two rankings are fused.
+    """
+
+    def __init__(self, doc_id: int, workspace_id: int, file_path: str):
+        self.doc_id = doc_id
+        self.workspace_id = workspace_id
+        self.file_path = file_path
+
+        self._version: Optional[int] = None
+        self._loaded_at = 0.0
+        self._documents: Optional[_Matrix] = None
+        self._notes: Optional[_Matrix] = None
+        self._lexical: Optional[LexicalIndex] = None
+        self._rows_by_key: Dict[ChunkKey, int] = {}
+
+    def is_fresh(self) -> bool:
+        return (
+            self._version == document_version(self.doc_id)
+            and time.monotonic() - self._loaded_at
+            < settings.VECTOR_SLICE_MAX_AGE_SECONDS
+        )
+
+    def load(self):
+        # read the version first so a change during the fetch triggers a reload
+        version = document_version(self.doc_id)
+        where = {"doc_id": self.doc_id}
+        include = ["documents", "embeddings"]
+
+        documents = workspace_collection(self.workspace_id, "documents").get(
+            where=where, include=include + ["metadatas"]
+        )
+        self._documents = _Matrix(documents)
+        self._rows_by_key = {
+            (metadata["page_num"], metadata["chunk_num"]): row
+            for row, metadata in enumerate(documents["metadatas"] or [])
+        }
+        self._lexical = load_lexical_index(
+            self.file_path, settings.EMBEDDING_MODEL_NAME
+        )
+        self._notes = _Matrix(
+            workspace_collection(self.workspace_id, "notes").get(
+                where=where, include=include
+            )
+        )
+        self._version = version
+        self._loaded_at = time.monotonic()
+
+    def _query_vector(self, query: str) -> np.ndarray:
+        return np.asarray(embedding_provider.encode_query(query), dtype=np.float32)
+
+    def query_documents(self, query: str, top_k: Optional[int] = None) -> List[str]:
+        if not self.is_fresh():
+            self.load()
+        top_k = top_k or settings.RETRIEVAL_TOP_K
+
+        dense = self._documents.ranked(
+            self._query_vector(query), settings.RETRIEVAL_CANDIDATES
+        ).tolist()
+        if self._lexical is None:
+            return [self._documents.texts[i] for i in dense[:top_k]]
+
+        # chunks the index knows but Chroma does not (a reindex in flight)
+        # are skipped
+        lexical = [
+            self._rows_by_key[key]
+            for key in self._lexical.top_k(query, settings.RETRIEVAL_CANDIDATES)
+            if key in self._rows_by_key
+        ]
+        fused = reciprocal_rank_fusion([dense, lexical], settings.RETRIEVAL_RRF_K)
+        return [self._documents.texts[i] for i in fused[:top_k]]
+
+    def query_notes(self, query: str, top_k: Optional[int] = None) -> List[str]:
+        if not self.is_fresh():
+            self.load()
+        return self._notes.top_k(
+            self._query_vector(query), top_k or settings.RETRIEVAL_TOP_K
+        )
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from db.session import Base
+from models import db_models  # noqa: F401, registers the tables
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Async sessions on a fresh SQLite database with every table created."""
+    # no pooling: each test drives its own event loops with asyncio.run
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'test.db'}", poolclass=NullPool
+    )
+
+    async def create_all():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+    asyncio.run(create_all())
+    yield async_sessionmaker(
+        engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def sync_session_factory(tmp_path):
+    """Sync sessions, as the ingestion workers use, on a fresh SQLite database."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'sync.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
@@ -0,0 +1,32 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from services.blob_store import file_sha256, write_chunk
+
+
+async def _stream(*parts):
+    for part in parts:
+        yield part
+
+
+def test_chunks_land_at_their_offsets(tmp_path):
+    path = tmp_path / "upload.part"
+    path.write_bytes(b"")
+
+    asyncio.run(write_chunk(str(path), 0, _stream(b"abc", b"def"), limit=6))
+    # a retried chunk overwrites rather than appends
+    asyncio.run(write_chunk(str(path), 3, _stream(b"DEF"), limit=3))
+    asyncio.run(write_chunk(str(path), 6, _stream(b"ghi"), limit=3))
+
+    assert path.read_bytes() == b"abcDEFghi"
+    assert file_sha256(str(path)) == hashlib.sha256(b"abcDEFghi").hexdigest()
+
+
+def test_chunk_over_the_limit_is_rejected(tmp_path):
+    path = tmp_path / "upload.part"
+    path.write_bytes(b"")
+
+    with pytest.raises(ValueError):
+        asyncio.run(write_chunk(str(path), 0, _stream(b"abc", b"def"), limit=4))
@@ -0,0 +1,38 @@
+from utils import cache
+from utils.cache import TTLCache
+
+
+def test_evicts_least_recently_used():
+    c = TTLCache(maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+
+    assert c.get("a") == 1
+    assert c.get("b") is None
+    assert c.get("c") == 3
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+
+    c = TTLCache(maxsize=10, ttl=5)
+    c.set("a", 1)
+    now[0] += 4
+    assert c.get("a") == 1
+
+    now[0] += 2
+    assert c.get("a") is None
+    assert len(c) == 0
+
+
+def test_counts_hits_and_misses():
+    c = TTLCache(maxsize=10)
+    c.set("a", 1)
+    c.get("a")
+    c.get("a")
+    c.get("b")
+
+    assert c.stats() == {"hits": 2, "misses": 1, "size": 1, "maxsize": 10}
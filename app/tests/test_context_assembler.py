@@ -0,0 +1,47 @@
+from services.context_assembler import ContextAssembler
+
+
+def _words(text: str) -> int:
+    return len(text.split())
+
+
+def _text(start: int, count: int) -> str:
+    return " ".join(f"w{i}" for i in range(start, start + count))
+
+
+def test_near_duplicates_are_dropped():
+    assembler = ContextAssembler(token_budget=1000, count_tokens=_words)
+    first = _text(0, 40)
+    # the next chunk of the same page, mostly splitter overlap
+    overlapping = _text(4, 40)
+
+    docs, notes, tokens, duplicates = assembler.assemble(
+        [first, overlapping, _text(100, 40)], []
+    )
+
+    assert docs == [first, _text(100, 40)]
+    assert duplicates == 1
+    assert tokens == 80
+
+
+def test_packs_into_budget_in_rank_order():
+    assembler = ContextAssembler(token_budget=50, count_tokens=_words)
+    note = _text(500, 10)
+
+    docs, notes, tokens, _ = assembler.assemble(
+        [_text(0, 30), _text(100, 30), _text(200, 5)], [note]
+    )
+
+    # the note ranks first, the second chunk no longer fits, the third does
+    assert notes == [note]
+    assert docs == [_text(0, 30), _text(200, 5)]
+    assert tokens == 45
+
+
+def test_oversized_best_chunk_is_truncated():
+    assembler = ContextAssembler(token_budget=20, count_tokens=_words)
+
+    docs, _, tokens, _ = assembler.assemble([_text(0, 100)], [])
+
+    assert docs == [_text(0, 20)]
+    assert tokens == 20
@@ -0,0 +1,21 @@
+from sqlalchemy import DateTime
+
+from db.session import Base
+from models import db_models  # noqa: F401, registers the tables
+
+
+def test_timestamps_are_timezone_aware_and_set_per_row():
+    # asyncpg refuses aware datetimes for naive columns, and the defaults
+    # are aware
+    columns = [
+        column
+        for table in Base.metadata.tables.values()
+        for column in table.columns
+        if isinstance(column.type, DateTime)
+    ]
+    assert columns
+
+    for column in columns:
+        assert column.type.timezone, column
+        if column.default is not None:
+            assert column.default.is_callable, column
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+
+import numpy as np
+
+from services import chroma_db
+
+
+def test_query_is_not_queued_behind_ingestion(monkeypatch):
+    released = threading.Event()
+
+    def encode(texts, **kwargs):
+        if len(texts) > 1:
+            # an ingestion batch that takes as long as the test wants
+            released.wait(5)
+        return np.zeros((len(texts), 2))
+
+    monkeypatch.setattr(chroma_db.embedding_model, "encode", encode)
+
+    async def run():
+        batch = asyncio.ensure_future(
+            chroma_db.embedding_executor.encode(["chunk"] * 64)
+        )
+        await asyncio.sleep(0.05)
+
+        try:
+            return await asyncio.wait_for(
+                chroma_db.embedding_provider.aencode_query("not cached yet"), 1
+            )
+        finally:
+            released.set()
+            await batch
+
+    assert asyncio.run(run()) == [0.0, 0.0]
@@ -0,0 +1,47 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from utils.file_response import conditional_file_response
+
+
+def _client(path):
+    app = FastAPI()
+
+    @app.get("/file")
+    async def get_file(request: Request):
+        return await conditional_file_response(
+            request, str(path), media_type="application/pdf", etag="abc"
+        )
+
+    return TestClient(app)
+
+
+def test_revalidation_with_matching_etag_is_304(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"0123456789")
+    client = _client(path)
+
+    first = client.get("/file")
+    assert first.status_code == 200
+    assert first.headers["etag"] == '"abc"'
+    assert first.headers["content-length"] == "10"
+
+    again = client.get("/file", headers={"If-None-Match": '"abc"'})
+    assert again.status_code == 304
+    assert again.content == b""
+
+    since = client.get(
+        "/file", headers={"If-Modified-Since": first.headers["last-modified"]}
+    )
+    assert since.status_code == 304
+
+
+def test_range_request_returns_partial_content(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"0123456789")
+
+    response = _client(path).get("/file", headers={"Range": "bytes=2-5"})
+
+    assert response.status_code == 206
+    assert response.content == b"2345"
+    assert response.headers["content-range"] == "bytes 2-5/10"
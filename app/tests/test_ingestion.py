@@ -0,0 +1,184 @@
+import asyncio
+import time
+from datetime import timedelta
+
+import pytest
+
+from core.config import settings
+from models import db_models
+from models.db_models import IngestionStatusEnum
+from services import ingestion
+
+
+@pytest.fixture
+def db_factory(sync_session_factory, monkeypatch):
+    monkeypatch.setattr(ingestion, "SessionLocal", sync_session_factory)
+    return sync_session_factory
+
+
+def _queue_document(db_factory) -> tuple:
+    with db_factory() as db:
+        user = db_models.User(username="u", email="u@x.io", hashed_password="x")
+        db.add(user)
+        db.commit()
+        workspace = db_models.Workspace(name="w", user_id=user.id)
+        db.add(workspace)
+        db.commit()
+        doc = db_models.Document(
+            filename="a.pdf", file_path="a.pdf", workspace_id=workspace.id
+        )
+        db.add(doc)
+        db.commit()
+        job = db_models.IngestionJob(
+            document_id=doc.id, status=db_models.IngestionStatusEnum.queued
+        )
+        db.add(job)
+        db.commit()
+        return workspace.id, doc.id, job.id
+
+
+def _job(db_factory, job_id: int) -> db_models.IngestionJob:
+    with db_factory() as db:
+        return db.get(db_models.IngestionJob, job_id)
+
+
+def _go_silent(db_factory, job_id: int, attempts: int):
+    # as if the claiming worker died mid-parse long ago
+    with db_factory() as db:
+        job = db.get(db_models.IngestionJob, job_id)
+        job.status = IngestionStatusEnum.parsing
+        job.attempts = attempts
+        job.updated_at = ingestion._now() - timedelta(
+            seconds=settings.INGESTION_STALE_AFTER_SECONDS + 1
+        )
+        db.commit()
+
+
+def test_enqueue_adds_a_queued_job_and_wakes_the_pool(session_factory, monkeypatch):
+    woken = []
+    monkeypatch.setattr(ingestion.ingestion_pool, "notify", lambda: woken.append(1))
+
+    async def run():
+        async with session_factory() as db:
+            doc = db_models.Document(filename="a.pdf", file_path="a.pdf")
+            job = await ingestion.enqueue_document(db, doc)
+
+        # the document and its job were committed together
+        async with session_factory() as db:
+            saved = await db.get(db_models.IngestionJob, job.id)
+            return saved.document_id, saved.status, doc.id
+
+    document_id, status, doc_id = asyncio.run(run())
+
+    assert document_id == doc_id
+    assert status == IngestionStatusEnum.queued
+    assert woken
+
+
+def test_claim_takes_a_queued_job_once(db_factory):
+    _, _, job_id = _queue_document(db_factory)
+
+    assert ingestion._claim_next_job() == job_id
+    assert ingestion._claim_next_job() is None
+
+    job = _job(db_factory, job_id)
+    assert job.status == IngestionStatusEnum.parsing
+    assert job.attempts == 1
+
+
+def test_silent_job_is_requeued(db_factory):
+    _, _, job_id = _queue_document(db_factory)
+    _go_silent(db_factory, job_id, attempts=1)
+
+    assert ingestion._claim_next_job() == job_id
+    assert _job(db_factory, job_id).attempts == 2
+
+
+def test_silent_job_out_of_attempts_is_failed(db_factory, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_MAX_ATTEMPTS", 2)
+    _, _, job_id = _queue_document(db_factory)
+    _go_silent(db_factory, job_id, attempts=2)
+
+    assert ingestion._claim_next_job() is None
+
+    job = _job(db_factory, job_id)
+    assert job.status == IngestionStatusEnum.failed
+    assert job.finished_at is not None
+
+
+def test_vectors_written_after_workspace_delete_are_dropped(db_factory, monkeypatch):
+    workspace_id, doc_id, job_id = _queue_document(db_factory)
+    dropped = []
+
+    async def save_document(doc, on_progress):
+        # the workspace is deleted while the job is indexing
+        with db_factory() as db:
+            db.delete(db.get(db_models.Workspace, workspace_id))
+            db.commit()
+        return []
+
+    monkeypatch.setattr(ingestion, "chroma_save_document", save_document)
+    monkeypatch.setattr(ingestion, "chroma_drop_workspace", dropped.append)
+
+    assert ingestion._claim_next_job() == job_id
+    asyncio.run(ingestion._process_job(job_id))
+
+    assert dropped == [workspace_id]
+
+
+def test_document_detached_from_its_workspace_is_not_indexed(db_factory, monkeypatch):
+    workspace_id, doc_id, job_id = _queue_document(db_factory)
+    with db_factory() as db:
+        db.delete(db.get(db_models.Workspace, workspace_id))
+        db.commit()
+
+    async def save_document(doc, on_progress):
+        raise AssertionError("indexed a detached document")
+
+    monkeypatch.setattr(ingestion, "chroma_save_document", save_document)
+
+    asyncio.run(ingestion._process_job(ingestion._claim_next_job()))
+
+    with db_factory() as db:
+        job = db.get(db_models.IngestionJob, job_id)
+        assert job.status == db_models.IngestionStatusEnum.failed
+
+
+def test_worker_does_not_overwrite_a_job_taken_over_by_another(db_factory, monkeypatch):
+    _, _, job_id = _queue_document(db_factory)
+
+    async def save_document(doc, on_progress):
+        # requeued as stale and claimed again while this worker still ran
+        with db_factory() as db:
+            job = db.get(db_models.IngestionJob, job_id)
+            job.attempts += 1
+            db.commit()
+        return []
+
+    monkeypatch.setattr(ingestion, "chroma_save_document", save_document)
+
+    asyncio.run(ingestion._process_job(ingestion._claim_next_job()))
+
+    job = _job(db_factory, job_id)
+    assert job.status == IngestionStatusEnum.parsing
+    assert job.attempts == 2
+
+
+def test_heartbeat_keeps_a_slow_job_alive(db_factory, monkeypatch):
+    monkeypatch.setattr(settings, "INGESTION_HEARTBEAT_SECONDS", 0.05)
+    _, _, job_id = _queue_document(db_factory)
+    beats = []
+
+    async def save_document(doc, on_progress):
+        # a parse that blocks the worker without reporting progress
+        claimed_at = _job(db_factory, job_id).updated_at
+        time.sleep(0.3)
+        beats.append(_job(db_factory, job_id).updated_at > claimed_at)
+        return []
+
+    monkeypatch.setattr(ingestion, "chroma_save_document", save_document)
+
+    asyncio.run(ingestion._process_job(ingestion._claim_next_job()))
+
+    assert beats == [True]
+    assert _job(db_factory, job_id).status == IngestionStatusEnum.indexed
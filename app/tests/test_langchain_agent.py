@@ -0,0 +1,42 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage
+
+from services.langchain_agent import RollingSummaryMemory, build_memory_from_db
+from services.llm_providers import FakeStreamingChatModel
+
+
+def test_empty_feynman_level_means_no_level():
+    # chat inputs send "" when no level is picked
+    memory = build_memory_from_db([], "feynman", "")
+
+    assert memory.messages == build_memory_from_db([], "feynman").messages
+
+
+def _memory(turns: int) -> RollingSummaryMemory:
+    memory = RollingSummaryMemory(
+        (), None, 0, token_budget=10_000, recent_turns=2, compact_batch=4
+    )
+    for seq in range(1, 2 * turns + 1):
+        message = HumanMessage(f"q{seq}") if seq % 2 else AIMessage(f"a{seq}")
+        memory.add_message(seq, message)
+    return memory
+
+
+def test_compaction_folds_a_bounded_slice_per_pass():
+    memory = _memory(turns=6)
+    llm = FakeStreamingChatModel(ttft_ms=0, tokens_per_second=10_000, response_tokens=1)
+
+    assert asyncio.run(memory.acompact(llm))
+    assert memory.summarized_through_seq == 4
+    assert len(memory.recent) == 8
+
+    assert asyncio.run(memory.acompact(llm))
+    assert not asyncio.run(memory.acompact(llm))
+    assert memory.summarized_through_seq == 8
+
+
+def test_prompt_leaves_out_messages_waiting_to_be_folded():
+    memory = _memory(turns=6)
+
+    assert [m.content for m in memory.messages] == ["q9", "a10", "q11", "a12"]
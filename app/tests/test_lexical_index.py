@@ -0,0 +1,50 @@
+from services.lexical_index import (
+    LexicalIndex,
+    lexical_index_path,
+    load_lexical_index,
+    reciprocal_rank_fusion,
+    tokenize,
+    write_lexical_index,
+)
+
+CHUNKS = [
+    ((0, 0), "Entropy and temperature in closed systems"),
+    ((0, 1), "The contract clause was upheld by the court"),
+    ((1, 0), "Çözüm: the court ruled on the contract, then the contract again"),
+    ((2, 0), "Protein folding inside the cell membrane"),
+]
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("ÇÖZÜM, Çözüm cozum a 42") == ["cozum", "cozum", "cozum", "42"]
+
+
+def test_bm25_ranks_matching_chunks():
+    index = LexicalIndex.build("model", CHUNKS)
+
+    assert index.top_k("contract court", 10) == [(1, 0), (0, 1)]
+    assert index.top_k("cozum", 10) == [(1, 0)]
+    assert index.top_k("unrelated words", 10) == []
+
+
+def test_index_round_trip(tmp_path):
+    blob = str(tmp_path / "blob.pdf")
+    write_lexical_index(blob, "model", CHUNKS)
+
+    index = load_lexical_index(blob, "model")
+    assert len(index) == 4
+    assert index.top_k("membrane", 5) == [(2, 0)]
+
+    # chunk boundaries belong to the model's tokenizer
+    assert load_lexical_index(blob, "other-model") is None
+
+    with open(lexical_index_path(blob), "r+b") as f:
+        f.truncate(f.seek(0, 2) - 4)
+    assert load_lexical_index(blob, "model") is None
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([[1, 2, 3], [3, 4, 1]], k=60)
+
+    assert fused[:2] == [1, 3]
+    assert set(fused) == {1, 2, 3, 4}
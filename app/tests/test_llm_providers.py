@@ -0,0 +1,41 @@
+import asyncio
+
+from langchain_core.messages import HumanMessage
+
+from services.llm_providers import (
+    FakeStreamingChatModel,
+    RecordingChatModel,
+    ReplayChatModel,
+)
+
+
+def _stream(llm, text):
+    async def collect():
+        return [
+            chunk.content
+            async for chunk in llm.astream([HumanMessage(text)])
+            if chunk.content
+        ]
+
+    return asyncio.run(collect())
+
+
+def test_fake_model_streams_configured_number_of_tokens():
+    llm = FakeStreamingChatModel(ttft_ms=0, tokens_per_second=10_000, response_tokens=5)
+
+    assert len(_stream(llm, "hi")) == 5
+    assert asyncio.run(llm.ainvoke("hi")).content.count("token") == 5
+
+
+def test_replay_returns_recorded_stream(tmp_path):
+    path = str(tmp_path / "sessions.jsonl")
+    inner = FakeStreamingChatModel(
+        ttft_ms=0, tokens_per_second=10_000, response_tokens=3
+    )
+
+    recorded = _stream(RecordingChatModel(inner=inner, path=path), "question")
+    replay = ReplayChatModel(path=path, speed=1000)
+
+    assert _stream(replay, "question") == recorded
+    # unknown prompts fall back to the recordings in order
+    assert _stream(replay, "something else") == recorded
@@ -0,0 +1,24 @@
+from core.metrics import Gauge, Histogram
+
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("wait_ms", "Wait.", labels=("engine",), buckets=(1, 10))
+    h.observe(0.5, "sync")
+    h.observe(5, "sync")
+    h.observe(50, "sync")
+
+    lines = h.render()
+
+    assert 'wait_ms_bucket{engine="sync",le="1"} 1' in lines
+    assert 'wait_ms_bucket{engine="sync",le="10"} 2' in lines
+    assert 'wait_ms_bucket{engine="sync",le="+Inf"} 3' in lines
+    assert 'wait_ms_count{engine="sync"} 3' in lines
+
+
+def test_gauge_reads_values_at_render_time():
+    values = {("sync",): 1}
+    g = Gauge("in_use", "In use.", lambda: values, labels=("engine",))
+
+    values[("sync",)] = 4
+
+    assert 'in_use{engine="sync"} 4' in g.render()
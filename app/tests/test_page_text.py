@@ -0,0 +1,36 @@
+import pytest
+
+from services.page_text import (
+    PageTextReader,
+    open_page_text,
+    page_text_path,
+    write_page_text,
+)
+
+
+def test_pages_round_trip(tmp_path):
+    blob = str(tmp_path / "blob.pdf")
+    pages = ["first page", "", "çok dilli sayfa ✓" * 50]
+
+    write_page_text(blob, pages)
+
+    with open_page_text(blob) as reader:
+        assert len(reader) == 3
+        assert reader.page(2) == pages[2]
+        assert list(reader) == pages
+        with pytest.raises(IndexError):
+            reader.page(3)
+
+
+def test_missing_or_truncated_sidecar_is_ignored(tmp_path):
+    blob = str(tmp_path / "blob.pdf")
+    assert open_page_text(blob) is None
+
+    write_page_text(blob, ["some text"])
+    path = page_text_path(blob)
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 1)
+
+    with pytest.raises(ValueError):
+        PageTextReader(path)
+    assert open_page_text(blob) is None
@@ -0,0 +1,26 @@
+import asyncio
+
+from pypdf import PdfReader
+
+from benchmarks.synthetic_pdf import make_synthetic_pdf
+from core.config import settings
+from services.pdf_pages import iter_pdf_pages_parallel, shutdown_pdf_pool
+
+
+def test_parallel_pages_match_sequential_extraction(tmp_path, monkeypatch):
+    pdf_path = make_synthetic_pdf(str(tmp_path / "doc.pdf"), pages=11)
+    monkeypatch.setattr(settings, "PDF_PARSE_WORKERS", 2)
+    monkeypatch.setattr(settings, "PDF_PARSE_PAGES_PER_TASK", 3)
+
+    async def collect():
+        return [page async for page in iter_pdf_pages_parallel(pdf_path, 11)]
+
+    try:
+        pages = asyncio.run(collect())
+    finally:
+        shutdown_pdf_pool()
+
+    expected = [
+        (i, page.extract_text()) for i, page in enumerate(PdfReader(pdf_path).pages)
+    ]
+    assert pages == expected
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from scripts import reembed
+
+
+class FakeCollection:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+        self.rows = {}
+
+    def add(self, ids, documents, embeddings, metadatas):
+        self.rows.update(zip(ids, documents))
+
+    def modify(self, name):
+        self.client.collections[name] = self.client.collections.pop(self.name)
+        self.name = name
+
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+        self.fail_deletes = False
+
+    def get_max_batch_size(self):
+        return 100
+
+    def list_collections(self):
+        return list(self.collections.values())
+
+    def get_collection(self, name):
+        return self.collections[name]
+
+    def get_or_create_collection(self, name, **kwargs):
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(self, name)
+        return self.collections[name]
+
+    def delete_collection(self, name):
+        if self.fail_deletes:
+            raise KeyboardInterrupt
+        del self.collections[name]
+
+
+class FakeReembedder(reembed.Reembedder):
+    def __init__(self):
+        super().__init__(executor=None, workers=1, flush_size=10)
+
+    async def embed(self, texts):
+        return [[0.0] for _ in texts]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = FakeClient()
+    monkeypatch.setattr(reembed.chroma_db, "client", client)
+    return client
+
+
+def _sources(rows):
+    def sources(after_id):
+        for source_id, row in rows:
+            if source_id > after_id:
+                yield source_id, [row]
+
+    return sources
+
+
+def test_rebuilt_collection_replaces_the_live_one(client, tmp_path):
+    client.get_or_create_collection("docs").add(["old"], ["old"], [[0.0]], [{}])
+    checkpoint = reembed.Checkpoint(str(tmp_path / "ck.json"), "model")
+
+    rows = [(1, ("a", "new a", {})), (2, ("b", "new b", {}))]
+    asyncio.run(FakeReembedder().run("docs", _sources(rows), checkpoint))
+
+    assert set(client.collections) == {"docs"}
+    assert client.get_collection("docs").rows == {"a": "new a", "b": "new b"}
+    assert checkpoint.collection("docs")["swapped"]
+
+
+def test_rerun_after_interrupted_swap_keeps_the_rebuilt_collection(client, tmp_path):
+    client.get_or_create_collection("docs").add(["old"], ["old"], [[0.0]], [{}])
+    path = str(tmp_path / "ck.json")
+    checkpoint = reembed.Checkpoint(path, "model")
+
+    # killed after the shadow was renamed in, before the retired copy was gone
+    client.fail_deletes = True
+    rows = [(1, ("a", "new a", {}))]
+    with pytest.raises(KeyboardInterrupt):
+        asyncio.run(FakeReembedder().run("docs", _sources(rows), checkpoint))
+    client.fail_deletes = False
+
+    resumed = reembed.Checkpoint(path, "model")
+    assert resumed.load()
+    asyncio.run(FakeReembedder().run("docs", _sources(rows), resumed))
+
+    assert set(client.collections) == {"docs"}
+    assert client.get_collection("docs").rows == {"a": "new a"}
+    assert resumed.collection("docs")["swapped"]
+
+
+def test_rerun_before_first_rename_finishes_the_swap(client, tmp_path):
+    client.get_or_create_collection("docs").add(["old"], ["old"], [[0.0]], [{}])
+    shadow = client.get_or_create_collection("docs" + reembed.SHADOW_SUFFIX)
+    shadow.add(["a"], ["new a"], [[0.0]], [{}])
+
+    checkpoint = reembed.Checkpoint(str(tmp_path / "ck.json"), "model")
+    progress = checkpoint.collection("docs")
+    progress["last_id"] = 1
+    progress["retired"] = "docs__retired_1"
+
+    asyncio.run(FakeReembedder().run("docs", _sources([]), checkpoint))
+
+    assert set(client.collections) == {"docs"}
+    assert client.get_collection("docs").rows == {"a": "new a"}
@@ -0,0 +1,203 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import routes_workspace
+from db.session import get_async_db
+from models import db_models
+from models.schemas import Principal
+from services import chroma_db
+from utils.user_utils import get_current_principal
+
+
+class FakeCollection:
+    def __init__(self, rows):
+        # (id, text, metadata, distance), closest first as Chroma returns them
+        self.rows = sorted(rows, key=lambda row: row[3])
+
+    def query(self, query_embeddings, n_results, include):
+        rows = self.rows[:n_results]
+        return {
+            "ids": [[row[0] for row in rows]],
+            "documents": [[row[1] for row in rows]],
+            "metadatas": [[row[2] for row in rows]],
+            "distances": [[row[3] for row in rows]],
+        }
+
+
+def _setup(session_factory):
+    async def run():
+        async with session_factory() as db:
+            owner = db_models.User(username="a", email="a@x.io", hashed_password="x")
+            other = db_models.User(username="b", email="b@x.io", hashed_password="x")
+            db.add_all([owner, other])
+            await db.commit()
+
+            workspace = db_models.Workspace(name="w", user_id=owner.id)
+            foreign = db_models.Workspace(name="f", user_id=other.id)
+            db.add_all([workspace, foreign])
+            await db.commit()
+
+            doc = db_models.Document(
+                filename="a.pdf", file_path="a.pdf", workspace_id=workspace.id
+            )
+            db.add(doc)
+            await db.commit()
+
+            return owner, workspace.id, foreign.id, doc.id
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def search(session_factory, monkeypatch):
+    owner, workspace_id, foreign_id, doc_id = _setup(session_factory)
+    deleted_doc_id = doc_id + 100
+
+    collections = {
+        "documents": FakeCollection(
+            [
+                (
+                    "c1",
+                    "far chunk",
+                    {"doc_id": doc_id, "page_num": 2, "chunk_num": 1},
+                    0.4,
+                ),
+                (
+                    "c2",
+                    "close chunk",
+                    {"doc_id": doc_id, "page_num": 0, "chunk_num": 3},
+                    0.1,
+                ),
+                (
+                    "c3",
+                    "gone chunk",
+                    {"doc_id": deleted_doc_id, "page_num": 0, "chunk_num": 0},
+                    0.2,
+                ),
+            ]
+        ),
+        "notes": FakeCollection([("7", "a note", {"doc_id": doc_id}, 0.3)]),
+    }
+
+    async def aencode_query(text):
+        return [0.0]
+
+    monkeypatch.setattr(
+        chroma_db, "workspace_collection", lambda ws, kind: collections[kind]
+    )
+    monkeypatch.setattr(chroma_db.embedding_provider, "encode_query", lambda t: [0.0])
+    monkeypatch.setattr(chroma_db.embedding_provider, "aencode_query", aencode_query)
+
+    async def get_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(routes_workspace.router, prefix="/api/workspace")
+    app.dependency_overrides[get_async_db] = get_db
+    app.dependency_overrides[get_current_principal] = lambda: Principal(
+        id=owner.id, username=owner.username, email=owner.email
+    )
+
+    with TestClient(app) as client:
+        yield client, workspace_id, foreign_id, doc_id
+
+
+def test_search_maps_hits_closest_first(search):
+    client, workspace_id, _, doc_id = search
+
+    response = client.get(f"/api/workspace/{workspace_id}/search", params={"q": "x"})
+
+    assert response.status_code == 200
+    assert response.json()["hits"] == [
+        {
+            "kind": "document",
+            "document_id": doc_id,
+            "document_name": "a.pdf",
+            "page_num": 0,
+            "chunk_num": 3,
+            "note_id": None,
+            "text": "close chunk",
+            "distance": 0.1,
+        },
+        {
+            "kind": "note",
+            "document_id": doc_id,
+            "document_name": "a.pdf",
+            "page_num": None,
+            "chunk_num": None,
+            "note_id": 7,
+            "text": "a note",
+            "distance": 0.3,
+        },
+        {
+            "kind": "document",
+            "document_id": doc_id,
+            "document_name": "a.pdf",
+            "page_num": 2,
+            "chunk_num": 1,
+            "note_id": None,
+            "text": "far chunk",
+            "distance": 0.4,
+        },
+    ]
+
+
+def test_search_limit_is_applied_before_dropping_deleted_documents(search):
+    client, workspace_id, _, _ = search
+
+    response = client.get(
+        f"/api/workspace/{workspace_id}/search", params={"q": "x", "limit": 2}
+    )
+
+    # the second closest hit belongs to a deleted document
+    assert [hit["text"] for hit in response.json()["hits"]] == ["close chunk"]
+
+
+def test_search_rejects_a_limit_over_the_cap(search):
+    client, workspace_id, _, _ = search
+
+    response = client.get(
+        f"/api/workspace/{workspace_id}/search", params={"q": "x", "limit": 51}
+    )
+
+    assert response.status_code == 422
+
+
+def test_search_in_another_users_workspace_is_not_found(search):
+    client, _, foreign_id, _ = search
+
+    response = client.get(f"/api/workspace/{foreign_id}/search", params={"q": "x"})
+
+    assert response.status_code == 404
+
+
+def test_note_of_a_detached_document_is_deleted_without_chroma(
+    search, session_factory, monkeypatch
+):
+    client, _, _, _ = search
+    opened = []
+    monkeypatch.setattr(
+        chroma_db, "workspace_collection", lambda ws, kind: opened.append(ws)
+    )
+
+    async def add_detached_note():
+        async with session_factory() as db:
+            # what deleting its workspace leaves behind
+            doc = db_models.Document(filename="b.pdf", file_path="b.pdf")
+            db.add(doc)
+            await db.commit()
+            note = db_models.Note(document_id=doc.id, title="t")
+            db.add(note)
+            await db.commit()
+            return note.id
+
+    note_id = asyncio.run(add_detached_note())
+
+    response = client.delete(f"/api/workspace/notes/{note_id}")
+
+    assert response.status_code == 204
+    assert opened == []
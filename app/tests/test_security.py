@@ -0,0 +1,40 @@
+import asyncio
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+from core import security
+from core.security import HashingBusyError, PasswordHasher
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    hasher = PasswordHasher(workers=1, queue_limit=1, retry_after=3)
+    release = threading.Event()
+
+    async def scenario():
+        running = [asyncio.ensure_future(hasher.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(HashingBusyError) as exc:
+            await hasher.run(release.wait)
+
+        release.set()
+        await asyncio.gather(*running)
+        return exc.value
+
+    assert asyncio.run(scenario()).retry_after == 3
+
+
+def test_hash_with_another_cost_is_upgraded_on_verify():
+    hasher = PasswordHasher(workers=1, queue_limit=0, retry_after=1)
+    rounds = security.settings.BCRYPT_ROUNDS
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__default_rounds=rounds + 1).hash(
+        "pw"
+    )
+
+    valid, new_hash = asyncio.run(hasher.verify_and_update("pw", old_hash))
+
+    assert valid
+    assert new_hash and security.pwd_context.identify(new_hash) == "bcrypt"
+    assert not security.pwd_context.needs_update(new_hash)
@@ -0,0 +1,67 @@
+import asyncio
+
+from core.config import settings
+from models import db_models
+from models.schemas import UploadInit
+from services import blob_store, uploads
+
+
+def _setup(session_factory):
+    async def run():
+        async with session_factory() as db:
+            user = db_models.User(username="u", email="u@x.io", hashed_password="x")
+            db.add(user)
+            await db.commit()
+            workspace = db_models.Workspace(name="w", user_id=user.id)
+            db.add(workspace)
+            await db.commit()
+            return user.id, workspace.id
+
+    return asyncio.run(run())
+
+
+def test_quota_counts_open_sessions(session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "TMP_ROOT", str(tmp_path / "tmp"))
+    monkeypatch.setattr(settings, "UPLOAD_USER_QUOTA_BYTES", 150)
+    user_id, workspace_id = _setup(session_factory)
+    upload = UploadInit(filename="a.pdf", size=100, sha256="0" * 64)
+
+    async def run():
+        async with session_factory() as db:
+            first = await uploads.create_upload_session(
+                db, user_id, workspace_id, upload
+            )
+            second = await uploads.create_upload_session(
+                db, user_id, workspace_id, upload
+            )
+        return first, second
+
+    (session, rejection), (refused, reason) = asyncio.run(run())
+
+    assert session is not None and rejection is None
+    assert refused is None and reason == "Upload quota exceeded"
+
+
+def test_completed_upload_is_claimed_once(session_factory, tmp_path, monkeypatch):
+    monkeypatch.setattr(blob_store, "TMP_ROOT", str(tmp_path / "tmp"))
+    user_id, workspace_id = _setup(session_factory)
+    upload = UploadInit(filename="a.pdf", size=3, sha256="0" * 64)
+
+    async def run():
+        async with session_factory() as db:
+            session, _ = await uploads.create_upload_session(
+                db, user_id, workspace_id, upload
+            )
+            incomplete = await uploads.claim_completed_upload(db, session)
+            await uploads.advance_upload(db, session, 0, 3)
+
+        async with session_factory() as a, session_factory() as b:
+            return incomplete, await asyncio.gather(
+                uploads.claim_completed_upload(a, session),
+                uploads.claim_completed_upload(b, session),
+            )
+
+    incomplete, claims = asyncio.run(run())
+
+    assert not incomplete
+    assert sorted(claims) == [False, True]
@@ -0,0 +1,28 @@
+import asyncio
+
+from core import security
+from models.schemas import Principal
+from utils import user_utils
+
+
+def test_cached_principal_skips_the_database(monkeypatch):
+    principal = Principal(id=7, username="u", email="u@example.com")
+    user_utils.principal_cache.set(7, principal)
+
+    def no_db():
+        raise AssertionError("database was queried")
+
+    monkeypatch.setattr(user_utils, "AsyncSessionLocal", no_db)
+    token = security.create_access_token(data={"sub": "7"})
+
+    resolved = asyncio.run(user_utils.get_current_principal(f"Bearer {token}"))
+
+    assert resolved is principal
+
+
+def test_invalidate_principal_drops_the_entry():
+    user_utils.principal_cache.set(8, Principal(id=8, username="v", email="v@x.io"))
+
+    user_utils.invalidate_principal(8)
+
+    assert user_utils.principal_cache.get(8) is None
@@ -1,82 +1,266 @@
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 import os
-from services.chroma_db import chroma_query_documents, chroma_query_notes
+import time
+from services.chroma_db import (
+    chroma_query_documents,
+    chroma_query_notes,
+    embedding_provider,
+)
+from services.vector_slice import DocumentVectorSlice
 from models.schemas import ChatInput
 
 from models import db_models
 
 
-def get_or_create_chat_history(db: Session, chat_input: ChatInput):
+async def get_or_create_chat_history(db: AsyncSession, chat_input: ChatInput):
     filter_field = (
         db_models.ChatHistory.document_id
         if chat_input.tp == "document"
         else db_models.ChatHistory.note_id
     )
+    chat_mode = chat_input.feynman or chat_input.mode
 
-    if chat_input.feynman:
-        db_chat = (
-            db.query(db_models.ChatHistory)
-            .filter(filter_field == chat_input.id)
-            .filter(db_models.ChatHistory.chat_mode == chat_input.feynman)
-            .first()
+    db_chat = await db.scalar(
+        select(db_models.ChatHistory)
+        .filter(filter_field == chat_input.id)
+        .filter(db_models.ChatHistory.chat_mode == chat_mode)
+        .limit(1)
+    )
+
+    if not db_chat:
+        db_chat = db_models.ChatHistory(
+            chat_mode=chat_mode,
+            **{f"{chat_input.tp}_id": chat_input.id},
         )
+        db.add(db_chat)
+        await db.commit()
+        await db.refresh(db_chat)
+
+    return db_chat
+
+
+async def load_chat_messages(
+    db: AsyncSession, chat_id: int, after_seq: int = 0
+) -> List[dict]:
+    message = db_models.ChatMessage
+    rows = await db.execute(
+        select(message.seq, message.sender, message.text)
+        .filter(message.chat_id == chat_id)
+        .filter(message.seq > after_seq)
+        .order_by(message.seq)
+    )
+    return [{"seq": seq, "sender": sender, "text": text} for seq, sender, text in rows]
+
+
+async def load_chat_page(
+    db: AsyncSession,
+    chat_id: int,
+    limit: int,
+    before: Optional[int] = None,
+    after: Optional[int] = None,
+) -> Tuple[List[Tuple[int, str, str]], bool]:
+    """Returns one page of (seq, sender, text) in seq order, plus has_more.
+
+    Without a cursor this is the newest page. ``before`` walks back through
+    older messages, ``after`` forward through newer ones. Both are range scans
+    on the (chat_id, seq) primary key.
+    """
+    message = db_models.ChatMessage
+    query = select(message.seq, message.sender, message.text).filter(
+        message.chat_id == chat_id
+    )
 
-        if not db_chat:
-            db_chat = db_models.ChatHistory(
-                messages=[],
-                chat_mode=chat_input.feynman,
-                **{f"{chat_input.tp}_id": chat_input.id},
+    if after is not None:
+        rows = (
+            await db.execute(
+                query.filter(message.seq > after).order_by(message.seq).limit(limit + 1)
             )
-            db.add(db_chat)
-            db.commit()
-            db.refresh(db_chat)
-    else:
-        db_chat = (
-            db.query(db_models.ChatHistory)
-            .filter(filter_field == chat_input.id)
-            .filter(db_models.ChatHistory.chat_mode == chat_input.mode)
-            .first()
+        ).all()
+        return [tuple(row) for row in rows[:limit]], len(rows) > limit
+
+    if before is not None:
+        query = query.filter(message.seq < before)
+
+    rows = (await db.execute(query.order_by(message.seq.desc()).limit(limit + 1))).all()
+    return [tuple(row) for row in reversed(rows[:limit])], len(rows) > limit
+
+
+async def append_chat_messages(
+    db: AsyncSession, db_chat: db_models.ChatHistory, messages: List[Tuple[str, str]]
+) -> List[int]:
+    """Appends (sender, text) pairs and returns their seq numbers.
+
+    Cost depends only on the new messages, not on the history length.
+    """
+    chat_table = db_models.ChatHistory
+
+    # reserve seq numbers atomically so concurrent sessions never collide
+    last_seq = (
+        await db.execute(
+            update(chat_table)
+            .where(chat_table.id == db_chat.id)
+            .values(
+                last_seq=chat_table.last_seq + len(messages),
+                message_count=chat_table.message_count + len(messages),
+            )
+            .returning(chat_table.last_seq)
         )
-        if not db_chat:
-            db_chat = db_models.ChatHistory(
-                messages=[],
-                chat_mode=chat_input.mode,
-                **{f"{chat_input.tp}_id": chat_input.id},
+    ).scalar_one()
+
+    first_seq = last_seq - len(messages) + 1
+    db.add_all(
+        [
+            db_models.ChatMessage(
+                chat_id=db_chat.id, seq=first_seq + i, sender=sender, text=text
             )
-            db.add(db_chat)
-            db.commit()
-            db.refresh(db_chat)
+            for i, (sender, text) in enumerate(messages)
+        ]
+    )
+    await db.commit()
 
-    return db_chat
+    return list(range(first_seq, last_seq + 1))
 
 
-def load_context(chat_input: ChatInput, db: Session, user_input: str):
-    doc_texts, note_texts = [], []
+async def save_chat_summary(
+    db: AsyncSession, chat_id: int, summary: str, through_seq: int
+):
+    await db.execute(
+        update(db_models.ChatHistory)
+        .where(db_models.ChatHistory.id == chat_id)
+        .values(summary=summary, summarized_through_seq=through_seq)
+    )
+    await db.commit()
+
+
+async def clear_chat_messages(db: AsyncSession, db_chat: db_models.ChatHistory):
+    await db.execute(
+        delete(db_models.ChatMessage).where(db_models.ChatMessage.chat_id == db_chat.id)
+    )
+    db_chat.message_count = 0
+    db_chat.summary = None
+    await db.commit()
+
+
+async def _resolve_context_sources(chat_input: ChatInput, db: AsyncSession):
+    # -> (document row with id, workspace_id and file_path, note_texts, error)
+    # columns rather than entities, so a long-lived session never serves a
+    # note edited since it was first loaded
+    document, note = db_models.Document, db_models.Note
+    columns = (document.id, document.workspace_id, document.file_path)
+
+    if chat_input.tp == "document":
+        doc = (
+            await db.execute(select(*columns).filter(document.id == chat_input.id))
+        ).first()
+        if not doc or not os.path.exists(doc.file_path):
+            return None, [], "Document not found or file missing"
+
+        return doc, None, None
+
+    db_note = (
+        await db.execute(
+            select(note.document_id, note.content).filter(note.id == chat_input.id)
+        )
+    ).first()
+    if not db_note:
+        return None, [], "Note not found"
 
+    doc = (
+        await db.execute(select(*columns).filter(document.id == db_note.document_id))
+    ).first()
+    if not doc or not os.path.exists(doc.file_path):
+        return None, [], "Document not found or file missing"
+
+    return doc, [db_note.content], None
+
+
+async def _timed(timings: dict, stage: str, func, *args):
+    start = time.perf_counter()
     try:
-        if chat_input.tp == "document":
-            doc = db.query(db_models.Document).filter_by(id=chat_input.id).first()
-            if not doc or not os.path.exists(doc.file_path):
-                return [], [], "Document not found or file missing"
+        return await asyncio.to_thread(func, *args)
+    finally:
+        timings[stage] = (time.perf_counter() - start) * 1000
+
+
+async def load_context(
+    chat_input: ChatInput,
+    db: AsyncSession,
+    user_input: str,
+    vector_slices: Optional[Dict[int, DocumentVectorSlice]] = None,
+):
+    """Returns (doc_texts, note_texts, error, timings) for one chat turn.
 
-            doc_texts = chroma_query_documents(doc.id, user_input)
+    With ``vector_slices`` (kept by the caller for the session) retrieval runs
+    against an in-memory copy of the document's vectors. Otherwise the
+    document and note vector queries run concurrently in worker threads.
+    ``timings`` holds per-stage wall time in milliseconds.
+    """
+    timings = {}
+    start = time.perf_counter()
 
-            note_texts = chroma_query_notes(doc.id, user_input)
+    try:
+        lookup_start = time.perf_counter()
+        doc, note_texts, error = await _resolve_context_sources(chat_input, db)
+        timings["lookup_ms"] = (time.perf_counter() - lookup_start) * 1000
+        if error:
+            return [], [], error, timings
 
-        elif chat_input.tp == "note":
-            note = db.query(db_models.Note).filter_by(id=chat_input.id).first()
-            if not note:
-                return [], [], "Note not found"
+        # embed once up front; both queries then hit the query cache
+        embed_start = time.perf_counter()
+        await embedding_provider.aencode_query(user_input)
+        timings["embed_ms"] = (time.perf_counter() - embed_start) * 1000
 
-            note_texts.append(note.content)
+        if vector_slices is not None:
+            vector_slice = vector_slices.get(doc.id)
+            if vector_slice is None:
+                vector_slice = vector_slices[doc.id] = DocumentVectorSlice(
+                    doc.id, doc.workspace_id, doc.file_path
+                )
 
-            doc = db.query(db_models.Document).filter_by(id=note.document_id).first()
-            if not doc or not os.path.exists(doc.file_path):
-                return [], [], "Document not found or file missing"
+            if not vector_slice.is_fresh():
+                await _timed(timings, "slice_load_ms", vector_slice.load)
 
-            doc_texts = chroma_query_documents(doc.id, user_input)
+            search_start = time.perf_counter()
+            doc_texts = vector_slice.query_documents(user_input)
+            if note_texts is None:
+                note_texts = vector_slice.query_notes(user_input)
+            timings["search_ms"] = (time.perf_counter() - search_start) * 1000
+
+        elif note_texts is None:
+            doc_texts, note_texts = await asyncio.gather(
+                _timed(
+                    timings,
+                    "documents_ms",
+                    chroma_query_documents,
+                    doc.id,
+                    doc.workspace_id,
+                    user_input,
+                ),
+                _timed(
+                    timings,
+                    "notes_ms",
+                    chroma_query_notes,
+                    doc.id,
+                    doc.workspace_id,
+                    user_input,
+                ),
+            )
+        else:
+            doc_texts = await _timed(
+                timings,
+                "documents_ms",
+                chroma_query_documents,
+                doc.id,
+                doc.workspace_id,
+                user_input,
+            )
 
     except Exception as e:
-        return [], [], f"Failed to load context: {str(e)}"
+        return [], [], f"Failed to load context: {str(e)}", timings
+
+    timings["total_ms"] = (time.perf_counter() - start) * 1000
 
-    return doc_texts, note_texts, None
+    return doc_texts, note_texts or [], None, timings
@@ -0,0 +1,84 @@
+import asyncio
+import hashlib
+import os
+import stat
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response
+
+# browsers may keep a copy but must revalidate, which is a cheap 304
+CACHE_CONTROL = "private, no-cache"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+
+    # weak comparison, as RFC 9110 prescribes for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def _not_modified_since(if_modified_since: str, mtime: float) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+    # HTTP dates have one-second resolution
+    return int(mtime) <= since
+
+
+async def conditional_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    etag: Optional[str] = None,
+    filename: Optional[str] = None,
+) -> Response:
+    """Serves ``path`` with validators, answering revalidations with 304.
+
+    Starlette's FileResponse handles ``Range``/``If-Range`` (206) and hands
+    the file to the server's ``pathsend`` extension where one is offered.
+    ``etag`` defaults to one derived from size and mtime; pass the content
+    hash when there is one.
+    """
+    try:
+        stat_result = await asyncio.to_thread(os.stat, path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found on server")
+    if not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="File not found on server")
+
+    if etag is None:
+        etag_base = f"{stat_result.st_mtime}-{stat_result.st_size}"
+        etag = hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()
+    etag = f'"{etag}"'
+
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat_result.st_mtime, usegmt=True),
+        "Cache-Control": CACHE_CONTROL,
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if_modified_since = request.headers.get("if-modified-since")
+
+    # If-Modified-Since only counts when no If-None-Match was sent
+    if (if_none_match is not None and _etag_matches(if_none_match, etag)) or (
+        if_none_match is None
+        and if_modified_since is not None
+        and _not_modified_since(if_modified_since, stat_result.st_mtime)
+    ):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path,
+        media_type=media_type,
+        headers=headers,
+        filename=filename,
+        content_disposition_type="inline",
+        stat_result=stat_result,
+    )
@@ -1,12 +1,29 @@
-from fastapi import Depends, HTTPException, Header
+from fastapi import HTTPException, Header
 from jose import JWTError
-from sqlalchemy.orm import Session
-from db.session import get_db
+from sqlalchemy import event
+from db.session import AsyncSessionLocal
 from models.db_models import User
+from models.schemas import Principal
 from core import security
+from core.config import settings
+from utils.cache import TTLCache
 
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE, ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
 
-def get_current_user(authorization: str = Header(...), db: Session = Depends(get_db)):
+
+def invalidate_principal(user_id: int):
+    principal_cache.pop(user_id)
+
+
+@event.listens_for(User, "after_delete")
+def _drop_deleted_user(mapper, connection, target: User):
+    # ORM deletes only; bulk DELETE statements rely on the TTL
+    invalidate_principal(target.id)
+
+
+async def get_current_principal(authorization: str = Header(...)) -> Principal:
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="Invalid authorization header")
 
@@ -17,11 +34,22 @@ def get_current_user(authorization: str = Header(...), db: Session = Depends(get
         user_id = payload.get("sub")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token payload")
-    except JWTError:
+        # asyncpg does not coerce the string claim to the integer column
+        user_id = int(user_id)
+    except (JWTError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == user_id).first()
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    return user
+    principal = Principal.model_validate(user)
+    principal_cache.set(user_id, principal)
+
+    return principal
+